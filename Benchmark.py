@@ -0,0 +1,131 @@
+import time
+from functools import partial
+from random import choices, random, sample
+from typing import Callable, Sequence
+
+import numpy as np
+
+from Crossover import davis_order_crossover, order_crossover, partially_mapped_crossover, cycle_crossover, edge_recombination_crossover
+from Mutation import bit_flip_mutation_per_gene, bit_flip_mutation_per_gene_array
+from Evolution import rng
+from NSGA import naive_non_dominated_sort, sweep_non_dominated_sort, ens_non_dominated_sort
+from Population import (generate_binary_population, generate_listed_permutation_population, generate_2d_population, generate_nqueen_board,
+                        generate_binary_population_array, generate_listed_permutation_population_array, generate_grid_population, generate_nqueen_board_array)
+
+
+# Runs func 'repeat' times and returns the best wall clock time in seconds
+def best_time(func: Callable[[], object], repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        func()
+        best = min(best, time.perf_counter() - start_time)
+    return best
+
+
+# --- PERMUTATION CROSSOVERS ---
+def benchmark_permutation_crossovers(sizes: Sequence[int] = (10_000, 50_000, 100_000), quadratic_limit: int = 10_000) -> None:
+    operators = {
+        "davis_order_crossover": davis_order_crossover,
+        "order_crossover": order_crossover,
+        "order_crossover (trusted)": partial(order_crossover, validate=False),
+        "partially_mapped_crossover": partially_mapped_crossover,
+        "partially_mapped_crossover (trusted)": partial(partially_mapped_crossover, validate=False),
+        "cycle_crossover": cycle_crossover,
+        "cycle_crossover (trusted)": partial(cycle_crossover, validate=False),
+        "edge_recombination_crossover": edge_recombination_crossover,
+        "edge_recombination_crossover (trusted)": partial(edge_recombination_crossover, validate=False),
+    }
+
+    print(f"{'operator':<40}" + "".join(f"{size:>12}" for size in sizes))
+    for name, operator in operators.items():
+        row = f"{name:<40}"
+        for size in sizes:
+            # The old O(n^2) operator is only timed on small tours
+            if operator is davis_order_crossover and size > quadratic_limit:
+                row += f"{'-':>12}"
+                continue
+            a = sample(range(size), size)
+            b = sample(range(size), size)
+            row += f"{best_time(lambda: operator(a, b, probability=1.0)):>11.4f}s"
+        print(row)
+
+
+# --- PER GENE MUTATION ---
+def benchmark_per_gene_mutation(genome_length: int = 100_000, population_size: int = 100) -> None:
+    probability = 1 / genome_length
+    genome = choices([0, 1], k=genome_length)
+    population = rng.integers(2, size=(population_size, genome_length), dtype=np.int8)
+
+    def random_per_gene():
+        for i in range(genome_length):
+            if random() < probability:
+                genome[i] ^= 1
+
+    def mask_per_gene():
+        population[rng.random(population.shape) < probability] ^= 1
+
+    print(f"Per gene mutation, length {genome_length}, probability 1/L")
+    print(f"{'random() per gene (1 genome)':<40}{best_time(random_per_gene):>11.6f}s")
+    print(f"{'geometric skip (1 genome)':<40}{best_time(lambda: bit_flip_mutation_per_gene(genome, probability)):>11.6f}s")
+    print(f"{f'full random mask ({population_size} genomes)':<40}{best_time(mask_per_gene):>11.6f}s")
+    print(f"{f'geometric skip array ({population_size} genomes)':<40}{best_time(lambda: bit_flip_mutation_per_gene_array(population, probability)):>11.6f}s")
+
+
+# --- NON-DOMINATED SORTING ---
+# Random objective vectors on a line with noise, so there are many fronts of realistic size
+def benchmark_non_dominated_sort(sizes: Sequence[int] = (10_000, 50_000, 100_000), objective_counts: Sequence[int] = (2, 3), naive_limit: int = 10_000) -> None:
+    sorts = {
+        "naive (Deb)": naive_non_dominated_sort,
+        "sweep (2 objectives)": sweep_non_dominated_sort,
+        "ENS-BS": ens_non_dominated_sort,
+    }
+
+    for objective_count in objective_counts:
+        print(f"\n{objective_count} objectives")
+        print(f"{'sort':<40}" + "".join(f"{size:>12}" for size in sizes))
+        for name, sort in sorts.items():
+            if sort is sweep_non_dominated_sort and objective_count != 2:
+                continue
+            row = f"{name:<40}"
+            for size in sizes:
+                # The O(M*N^2) sort is only timed on small populations
+                if sort is naive_non_dominated_sort and size > naive_limit:
+                    row += f"{'-':>12}"
+                    continue
+                objectives = rng.random((size, objective_count)) + rng.random((size, 1))
+                row += f"{best_time(lambda: sort(objectives), repeat=1):>11.4f}s"
+            print(row)
+
+
+# --- POPULATION INITIALIZERS ---
+def benchmark_population_initializers(sizes: Sequence[int] = (10_000, 100_000, 1_000_000), genome_length: int = 32, board: int = 8, list_limit: int = 100_000) -> None:
+    cities = list(range(board))
+    initializers = {
+        "binary (lists)": lambda size: generate_binary_population(size, genome_length),
+        "binary (array)": lambda size: generate_binary_population_array(size, genome_length),
+        "permutation (lists)": lambda size: generate_listed_permutation_population(size, cities, board),
+        "permutation (array)": lambda size: generate_listed_permutation_population_array(size, cities, board),
+        "2d grid (lists)": lambda size: generate_2d_population(size, board, board),
+        "2d grid (array)": lambda size: generate_grid_population(size, board, board),
+        "n queen board (lists)": lambda size: generate_nqueen_board(size, board, board),
+        "n queen board (array)": lambda size: generate_nqueen_board_array(size, board, board),
+    }
+
+    print(f"{'initializer':<40}" + "".join(f"{size:>12}" for size in sizes))
+    for name, initializer in initializers.items():
+        row = f"{name:<40}"
+        for size in sizes:
+            # The element by element initializers are only timed on smaller populations
+            if name.endswith("(lists)") and size > list_limit:
+                row += f"{'-':>12}"
+                continue
+            row += f"{best_time(lambda: initializer(size), repeat=1):>11.4f}s"
+        print(row)
+
+
+if __name__ == "__main__":
+    benchmark_permutation_crossovers()
+    benchmark_per_gene_mutation()
+    benchmark_non_dominated_sort()
+    benchmark_population_initializers()
@@ -1,21 +1,73 @@
 import time
 from functools import partial
+from typing import Optional
+
+import numpy as np
 
 # Import the core evolution engine and necessary operators
-from Evolution import run_evolution
-from Population import generate_timetable_population # We will create this
-from Selection import roulette_wheel_selection
-from Crossover import uniform_crossover # This is perfect for our needs
-from Mutation import timetable_mutation # We will create this
+from Evolution import ArrayPopulation, run_evolution, run_array_evolution
+from Population import generate_timetable_population, generate_timetable_population_array, generate_greedy_timetable_population_array, reporting_diversity
+from Selection import roulette_wheel_selection, roulette_wheel_selection_array
+from Crossover import uniform_crossover, timetable_crossover_array # This is perfect for our needs
+from Mutation import timetable_mutation, timetable_mutation_array # We will create this
 
 # --- 1. DEFINE THE DATA STRUCTURES ---
-from Data_Structure import ScheduledClass
+from Data_Structure import ScheduledClass, TimetableProblem
 
 # --- 2. DEFINE THE PROBLEM DATASET ---
 from Data import TEACHERS, ROOMS, COURSES, GROUPS, TIME_SLOTS
 
 
 
+HARD_PENALTY = 1000
+SOFT_PENALTY = 10
+BAD_DAYS = ("Wed",) # Maybe it's a sports day
+
+# Static class tables for the array genome: one class per (group, course) pair
+def timetable_problem(teachers: list, rooms: list, courses: list, groups: list, time_slots: list, bad_days: tuple = BAD_DAYS, teacher_unavailable: Optional[np.ndarray] = None) -> TimetableProblem:
+    course_index = {course.id: i for i, course in enumerate(courses)}
+    class_course, class_group = [], []
+    for g, group in enumerate(groups):
+        for course_id in group.course_ids:
+            class_course.append(course_index[course_id])
+            class_group.append(g)
+    class_course = np.array(class_course, dtype=np.int32)
+    class_group = np.array(class_group, dtype=np.int32)
+
+    teacher_index = {teacher.id: i for i, teacher in enumerate(teachers)}
+    course_teacher = np.array([teacher_index[course.teacher_id] for course in courses], dtype=np.int32)
+    group_size = np.array([group.size for group in groups], dtype=np.int64)
+    if teacher_unavailable is None:
+        teacher_unavailable = np.zeros((len(teachers), len(time_slots)), dtype=bool)
+
+    return TimetableProblem(
+        teachers=teachers,
+        rooms=rooms,
+        courses=courses,
+        groups=groups,
+        time_slots=time_slots,
+        class_course=class_course,
+        class_group=class_group,
+        class_teacher=course_teacher[class_course],
+        class_size=group_size[class_group],
+        room_capacity=np.array([room.capacity for room in rooms], dtype=np.int64),
+        bad_slot=np.array([slot.day in bad_days for slot in time_slots], dtype=bool),
+        teacher_unavailable=teacher_unavailable
+    )
+
+# Array genome -> list of ScheduledClass, for printing and the tuple based fitness
+def decode_timetable(genome: np.ndarray, problem: TimetableProblem) -> list[ScheduledClass]:
+    return [
+        ScheduledClass(
+            course=problem.courses[course],
+            group=problem.groups[group],
+            room=problem.rooms[room],
+            timeslot=problem.time_slots[slot]
+        )
+        for course, group, room, slot in zip(problem.class_course.tolist(), problem.class_group.tolist(), genome[0].tolist(), genome[1].tolist())
+    ]
+
+
 # --- 3. THE FITNESS FUNCTION ---
 
 def calculate_fitness(genome: list[ScheduledClass]) -> float:
@@ -26,7 +78,6 @@ def calculate_fitness(genome: list[ScheduledClass]) -> float:
     penalty = 0
 
     # --- Hard Constraint Penalties (High Value) ---
-    HARD_PENALTY = 1000
 
     # Group classes by timeslot for efficient clash detection
     schedule_by_slot = {}
@@ -60,11 +111,10 @@ def calculate_fitness(genome: list[ScheduledClass]) -> float:
             penalty += HARD_PENALTY
 
     # --- Soft Constraint Penalties (Lower Value) ---
-    SOFT_PENALTY = 10
 
     # Example: Penalize classes on Wednesday (maybe it's a sports day)
     for scheduled_class in genome:
-        if scheduled_class.timeslot.day == "Wed":
+        if scheduled_class.timeslot.day in BAD_DAYS:
             penalty += SOFT_PENALTY
 
     # The goal is to evolve a solution where penalty is 0, or as low as possible.
@@ -88,26 +138,136 @@ def print_timetable(genome: list[ScheduledClass]):
     print(f"Fitness Score: {calculate_fitness(genome):.4f}")
 
 
+# Same penalty as calculate_fitness for a whole (size, 2, classes) population.
+# Slot x teacher, slot x room and slot x group occupancy is counted with one bincount per kind, and a slot
+# costs HARD_PENALTY per kind in which anything is booked twice.
+# Classes in a slot their teacher is unavailable in cost HARD_PENALTY each (the tuple genome has no availability data).
+def timetable_penalty_array(population: ArrayPopulation, problem: TimetableProblem) -> np.ndarray:
+    size, classes = len(population), population.shape[2]
+    rooms = population[:, 0].astype(np.int64)
+    slots = population[:, 1].astype(np.int64)
+    slot_count = len(problem.time_slots)
+    genomes = np.arange(size)[:, None] * slot_count
+
+    penalty = np.zeros(size, dtype=np.int64)
+    for entity, count in ((problem.class_teacher, len(problem.teachers)), (rooms, len(problem.rooms)), (problem.class_group, len(problem.groups))):
+        cells = (genomes + slots) * count + entity
+        occupancy = np.bincount(cells.ravel(), minlength=size * slot_count * count).reshape(size, slot_count, count)
+        penalty += HARD_PENALTY * (occupancy > 1).any(axis=2).sum(axis=1)
+
+    penalty += HARD_PENALTY * (problem.room_capacity[rooms] < problem.class_size).sum(axis=1)
+    penalty += HARD_PENALTY * problem.teacher_unavailable[problem.class_teacher, slots].sum(axis=1)
+    penalty += SOFT_PENALTY * problem.bad_slot[slots].sum(axis=1)
+    return penalty
+
+def calculate_fitness_array(population: ArrayPopulation, problem: TimetableProblem) -> np.ndarray:
+    return 1.0 / (1.0 + timetable_penalty_array(population, problem))
+
+
+class TimetableCounters:
+    """
+    Occupancy counts of one array genome, kept up to date so moving a single class is scored and applied
+    without re-evaluating the whole timetable.
+    """
+    def __init__(self, genome: np.ndarray, problem: TimetableProblem):
+        self.genome = genome # Changed in place by move()
+        self.problem = problem
+        slot_count = len(problem.time_slots)
+
+        # occupancy[kind][slot, entity] for kind 0 teachers, 1 rooms, 2 groups;
+        # duplicates[kind][slot] is the number of entities of that kind booked more than once in the slot
+        self.occupancy = [np.zeros((slot_count, len(entities)), dtype=np.int64) for entities in (problem.teachers, problem.rooms, problem.groups)]
+        for kind in range(3):
+            np.add.at(self.occupancy[kind], (genome[1], self._entities(kind, genome[0])), 1)
+        self.duplicates = [(occupancy > 1).sum(axis=1).tolist() for occupancy in self.occupancy]
+
+        self.penalty = int(timetable_penalty_array(genome[None], problem)[0])
+
+    @property
+    def fitness(self) -> float:
+        return 1.0 / (1.0 + self.penalty)
+
+    def _entities(self, kind: int, rooms):
+        return (self.problem.class_teacher, rooms, self.problem.class_group)[kind]
+
+    def _entity(self, kind: int, k: int, room: int) -> int:
+        if kind == 1:
+            return room
+        return int((self.problem.class_teacher, None, self.problem.class_group)[kind][k])
+
+    # Penalty change if class k moved to (room, slot)
+    def move_delta(self, k: int, room: int, slot: int) -> int:
+        old_room, old_slot = int(self.genome[0, k]), int(self.genome[1, k])
+        delta = 0
+        for kind in range(3):
+            old, new = self._entity(kind, k, old_room), self._entity(kind, k, room)
+            if (old_slot, old) == (slot, new):
+                continue
+            changed = {old_slot: 0, slot: 0} # Change of the duplicate count per touched slot
+            if self.occupancy[kind][old_slot, old] == 2:
+                changed[old_slot] -= 1
+            if self.occupancy[kind][slot, new] == 1:
+                changed[slot] += 1
+            for s, change in changed.items():
+                before = self.duplicates[kind][s]
+                delta += HARD_PENALTY * (int(before + change > 0) - int(before > 0))
+
+        size = self.problem.class_size[k]
+        capacity = self.problem.room_capacity
+        delta += HARD_PENALTY * (int(capacity[room] < size) - int(capacity[old_room] < size))
+        delta += SOFT_PENALTY * (int(self.problem.bad_slot[slot]) - int(self.problem.bad_slot[old_slot]))
+        unavailable = self.problem.teacher_unavailable[self.problem.class_teacher[k]]
+        delta += HARD_PENALTY * (int(unavailable[slot]) - int(unavailable[old_slot]))
+        return delta
+
+    # Moves class k to (room, slot) and returns the new fitness
+    def move(self, k: int, room: int, slot: int) -> float:
+        self.penalty += self.move_delta(k, room, slot)
+        old_room, old_slot = int(self.genome[0, k]), int(self.genome[1, k])
+        for kind in range(3):
+            occupancy, duplicates = self.occupancy[kind], self.duplicates[kind]
+            old, new = self._entity(kind, k, old_room), self._entity(kind, k, room)
+
+            occupancy[old_slot, old] -= 1
+            if occupancy[old_slot, old] == 1:
+                duplicates[old_slot] -= 1
+            occupancy[slot, new] += 1
+            if occupancy[slot, new] == 2:
+                duplicates[slot] += 1
+
+        self.genome[0, k], self.genome[1, k] = room, slot
+        return self.fitness
+
+
 # --- 4. MAIN EXECUTION BLOCK ---
 
 if __name__ == "__main__":
     # First, determine all class assignments that need to be scheduled
-    classes_to_schedule = []
-    for group in GROUPS:
-        for course_id in group.course_ids:
-            course = next(c for c in COURSES if c.id == course_id)
-            classes_to_schedule.append({'course': course, 'group': group})
+    problem = timetable_problem(TEACHERS, ROOMS, COURSES, GROUPS, TIME_SLOTS)
 
     start_time = time.time()
 
     # Run the evolution!
-    population, generations = run_evolution(
-        populate_func=partial(generate_timetable_population, classes_to_schedule=classes_to_schedule, rooms=ROOMS, time_slots=TIME_SLOTS, size=50), # Larger population for a complex problem 
-        fitness_func=calculate_fitness,
+    # classes_to_schedule = [{'course': COURSES[course], 'group': GROUPS[group]} for course, group in zip(problem.class_course, problem.class_group)]
+    # population, generations = run_evolution(
+    #     populate_func=partial(generate_timetable_population, classes_to_schedule=classes_to_schedule, rooms=ROOMS, time_slots=TIME_SLOTS, size=50), # Larger population for a complex problem 
+    #     fitness_func=calculate_fitness,
+    #     fitness_limit=1.0, # Aim for a perfect score (0 penalty)
+    #     selection_func=roulette_wheel_selection, # From your existing selection.py
+    #     crossover_func=uniform_crossover, # From your existing crossover.py
+    #     mutation_func=partial(timetable_mutation, rooms=ROOMS, time_slots=TIME_SLOTS,probability=0.2), # Higher mutation probability can be good here
+    #     generation_limit=500
+    # )
+
+    # Room and timeslot indices per class in one (size, 2, classes) array
+    population, generations = run_array_evolution(
+        # populate_func=partial(generate_timetable_population_array, size=50, classes=len(problem.class_course), rooms=len(ROOMS), time_slots=len(TIME_SLOTS)),
+        populate_func=reporting_diversity(partial(generate_greedy_timetable_population_array, size=50, problem=problem), "greedy timetables"),
+        fitness_func=partial(calculate_fitness_array, problem=problem),
         fitness_limit=1.0, # Aim for a perfect score (0 penalty)
-        selection_func=roulette_wheel_selection, # From your existing selection.py
-        crossover_func=uniform_crossover, # From your existing crossover.py
-        mutation_func=partial(timetable_mutation, rooms=ROOMS, time_slots=TIME_SLOTS,probability=0.2), # Higher mutation probability can be good here
+        selection_func=roulette_wheel_selection_array,
+        crossover_func=timetable_crossover_array,
+        mutation_func=partial(timetable_mutation_array, rooms=len(ROOMS), time_slots=len(TIME_SLOTS), probability=0.2),
         generation_limit=500
     )
 
@@ -117,5 +277,5 @@ if __name__ == "__main__":
     print(f"Time taken: {end_time - start_time:.2f} seconds")
 
     # Print the best solution found
-    best_timetable = population[0]
+    best_timetable = decode_timetable(population[0], problem)
     print_timetable(best_timetable)
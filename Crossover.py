@@ -1,34 +1,44 @@
-from random import randint, random, sample
+from random import choice, randint, random, randrange, sample
 from typing import Tuple
 
-from Evolution import Genome
+import numpy as np
+
+from Evolution import Genome, ArrayPopulation, rng, genome_changes
+from Data_Structure import Bounds
 
 
 # CROSSOVER
+# Called with report_changes=True, the list crossovers also return each child's Change relative to its own parent
+# (a for the first child, b for the second), so the fitness can be updated incrementally.
+def _with_changes(a: Genome, b: Genome, child_a: Genome, child_b: Genome, report_changes: bool):
+    if not report_changes:
+        return child_a, child_b
+    return child_a, child_b, genome_changes(a, child_a), genome_changes(b, child_b)
+
 # Selects a single random point from both parent genome, cuts the genomes, swaps the portions and return the new childs as a tuple 
-def single_point_crossover(a: Genome, b: Genome, probability: float = 0.5) -> Tuple[Genome, Genome]:
+def single_point_crossover(a: Genome, b: Genome, probability: float = 0.5, report_changes: bool = False) -> Tuple[Genome, Genome]:
     if len(a)!=len(b):
         raise ValueError("Genomees of Both Parents must have same length.")
     
     length = len(a)
     if length < 2:
-        return a, b # Returns a Tuple of Tuple[a, b]
+        return _with_changes(a, b, a, b, report_changes) # Returns a Tuple of Tuple[a, b]
 
     if random() <= probability:
         p = randint(1, length-1) # Single Random Point
 
         # 1st-> a(0 to p-1)+b(p to rest) , 2nd-> b(0 to p-1)+a(p to rest)
-        return a[0:p] + b[p:], b[0:p] + a[p:]
+        return _with_changes(a, b, a[0:p] + b[p:], b[0:p] + a[p:], report_changes)
     else:
-        return a, b
+        return _with_changes(a, b, a, b, report_changes)
 
-def multi_point_crossover(a: Genome, b: Genome, points: int, probability: float = 0.5) -> Tuple[Genome, Genome]:
+def multi_point_crossover(a: Genome, b: Genome, points: int, probability: float = 0.5, report_changes: bool = False) -> Tuple[Genome, Genome]:
     if len(a)!=len(b):
         raise ValueError("Genomes of Both Parents must have same length.")
     
     length = len(a)
     if length < 2:
-        return a, b
+        return _with_changes(a, b, a, b, report_changes)
     
     if points >= length:
         raise ValueError("Number of crossover points must be less than genome length.")
@@ -56,17 +66,17 @@ def multi_point_crossover(a: Genome, b: Genome, points: int, probability: float
                 i = j
                 flag = True
         
-        return child_a, child_b
+        return _with_changes(a, b, child_a, child_b, report_changes)
     else:
-        return a, b
+        return _with_changes(a, b, a, b, report_changes)
 
-def uniform_crossover(a: Genome, b: Genome, probability: float = 0.5) -> Tuple[Genome, Genome]:
+def uniform_crossover(a: Genome, b: Genome, probability: float = 0.5, report_changes: bool = False) -> Tuple[Genome, Genome]:
     if len(a)!=len(b):
         raise ValueError("Genomees of Both Parents must have same length.")
     
     length = len(a)
     if length < 2:
-        return a, b # Returns a Tuple of Tuple[a, b]
+        return _with_changes(a, b, a, b, report_changes) # Returns a Tuple of Tuple[a, b]
 
     if random() <= probability:
         child_a = []
@@ -81,9 +91,9 @@ def uniform_crossover(a: Genome, b: Genome, probability: float = 0.5) -> Tuple[G
                 child_a.append(b[i])
                 child_b.append(a[i])
         
-        return child_a, child_b
+        return _with_changes(a, b, child_a, child_b, report_changes)
     else:
-        return a, b
+        return _with_changes(a, b, a, b, report_changes)
 
 def uniform_crossover_2d(a: Genome, b: Genome, probability: float = 0.5) -> Tuple[Genome, Genome]:
     if len(a) != len(b) or len(a[0]) != len(b[0]):
@@ -121,12 +131,8 @@ def whole_arithmetic_recombination(a: Genome, b: Genome, alpha: float, probabili
         return a, b # Returns a Tuple of Tuple[a, b]
     
     if random() <= probability:
-        child_a = []
-        child_b = []
-        
-        for i in range(length):
-            child_a.append( (alpha * a[i]) + ((1-alpha) * b[i]) )
-            child_b.append( (alpha * b[i]) + ((1-alpha) * a[i]) )
+        child_a = [(alpha * x) + ((1-alpha) * y) for x, y in zip(a, b)]
+        child_b = [(alpha * y) + ((1-alpha) * x) for x, y in zip(a, b)]
 
         return child_a, child_b
     else:
@@ -137,13 +143,13 @@ def is_permutation(a: Genome, b: Genome) -> bool:
     return sorted(a) == sorted(b) and len(set(a)) == len(a) == len(b)
 
 
-def davis_order_crossover(a: Genome, b: Genome, probability: float = 0.5) -> Tuple[Genome, Genome]:
+def davis_order_crossover(a: Genome, b: Genome, probability: float = 0.5, report_changes: bool = False) -> Tuple[Genome, Genome]:
     if len(a)!=len(b):
         raise ValueError("Genomees of Both Parents must have same length.")
     
     length = len(a)
     if length < 2:
-        return a, b # Returns a Tuple of Tuple[a, b]
+        return _with_changes(a, b, a, b, report_changes) # Returns a Tuple of Tuple[a, b]
     
     if not is_permutation(a, b):
         raise ValueError("Genomes must be valid permutations with unique and identical elements.")
@@ -168,9 +174,276 @@ def davis_order_crossover(a: Genome, b: Genome, probability: float = 0.5) -> Tup
         child_a = remaining_seg_a[:p[0]] + swap_seg_a + remaining_seg_a[p[0]:]
         child_b = remaining_seg_b[:p[0]] + swap_seg_b + remaining_seg_b[p[0]:]
 
-        return child_a, child_b
+        return _with_changes(a, b, child_a, child_b, report_changes)
     else:
-        return a, b
+        return _with_changes(a, b, a, b, report_changes)
+
+
+# --- FAST PERMUTATION CROSSOVERS ---
+# These work on integer encoded tours, i.e. every genome is a permutation of 0..n-1.
+# Each operator builds position / lookup arrays once, so producing a child costs O(n) instead of O(n^2).
+# Pass validate=False in a trusted loop (parents produced by these operators) to skip the O(n) permutation check.
+
+def is_integer_permutation(a: Genome, b: Genome) -> bool:
+    length = len(a)
+    if length != len(b):
+        return False
+
+    for genome in (a, b):
+        seen = bytearray(length)
+        for gene in genome:
+            if not 0 <= gene < length or seen[gene]:
+                return False
+            seen[gene] = 1
+    return True
+
+def _check_integer_permutations(a: Genome, b: Genome) -> None:
+    if len(a) != len(b):
+        raise ValueError("Genomes of Both Parents must have same length.")
+    if not is_integer_permutation(a, b):
+        raise ValueError("Genomes must be permutations of 0..n-1.")
+
+def _order_child(donor: Genome, filler: Genome, start: int, end: int) -> Genome:
+    length = len(donor)
+    child = list(donor)
+    used = bytearray(length)
+    for i in range(start, end + 1):
+        used[donor[i]] = 1
+
+    # Fill the positions after the segment (wrapping around) in the order the genes appear in the filler parent
+    index = (end + 1) % length
+    for k in range(end + 1, end + 1 + length):
+        gene = filler[k % length]
+        if not used[gene]:
+            child[index] = gene
+            index = (index + 1) % length
+    return child
+
+def order_crossover(a: Genome, b: Genome, probability: float = 0.5, validate: bool = True, report_changes: bool = False) -> Tuple[Genome, Genome]:
+    if validate:
+        _check_integer_permutations(a, b)
+
+    length = len(a)
+    if length < 2:
+        return _with_changes(a, b, a, b, report_changes)
+
+    if random() <= probability:
+        start, end = sorted(sample(range(length), 2))
+        return _with_changes(a, b, _order_child(a, b, start, end), _order_child(b, a, start, end), report_changes)
+    else:
+        return _with_changes(a, b, a, b, report_changes)
+
+def _pmx_child(donor: Genome, filler: Genome, start: int, end: int) -> Genome:
+    child = list(filler)
+    position = [0] * len(child)
+    for i, gene in enumerate(child):
+        position[gene] = i
+
+    # Swapping the donor gene into place keeps the child a permutation and follows the PMX mapping chain
+    for i in range(start, end + 1):
+        gene = donor[i]
+        j = position[gene]
+        displaced = child[i]
+        child[i], child[j] = gene, displaced
+        position[gene], position[displaced] = i, j
+    return child
+
+def partially_mapped_crossover(a: Genome, b: Genome, probability: float = 0.5, validate: bool = True, report_changes: bool = False) -> Tuple[Genome, Genome]:
+    if validate:
+        _check_integer_permutations(a, b)
+
+    length = len(a)
+    if length < 2:
+        return _with_changes(a, b, a, b, report_changes)
+
+    if random() <= probability:
+        start, end = sorted(sample(range(length), 2))
+        return _with_changes(a, b, _pmx_child(a, b, start, end), _pmx_child(b, a, start, end), report_changes)
+    else:
+        return _with_changes(a, b, a, b, report_changes)
+
+def cycle_crossover(a: Genome, b: Genome, probability: float = 0.5, validate: bool = True, report_changes: bool = False) -> Tuple[Genome, Genome]:
+    if validate:
+        _check_integer_permutations(a, b)
+
+    length = len(a)
+    if length < 2:
+        return _with_changes(a, b, a, b, report_changes)
+
+    if random() <= probability:
+        position_a = [0] * length
+        for i, gene in enumerate(a):
+            position_a[gene] = i
+
+        child_a = [0] * length
+        child_b = [0] * length
+        visited = bytearray(length)
+        keep = True # Alternate cycles are copied straight or crossed over
+
+        for start in range(length):
+            if visited[start]:
+                continue
+            i = start
+            while not visited[i]:
+                visited[i] = 1
+                if keep:
+                    child_a[i], child_b[i] = a[i], b[i]
+                else:
+                    child_a[i], child_b[i] = b[i], a[i]
+                i = position_a[b[i]]
+            keep = not keep
+
+        return _with_changes(a, b, child_a, child_b, report_changes)
+    else:
+        return _with_changes(a, b, a, b, report_changes)
+
+def _edge_recombination_child(first: Genome, second: Genome) -> Genome:
+    length = len(first)
+    adjacency = [set() for _ in range(length)]
+    for tour in (first, second):
+        for i in range(length):
+            adjacency[tour[i]].add(tour[i - 1])
+            adjacency[tour[i]].add(tour[(i + 1) % length])
+
+    # Unvisited cities with an index, so a random restart and the removal are both O(1)
+    unvisited = list(range(length))
+    unvisited_index = list(range(length))
+
+    child = []
+    current = first[0]
+    while True:
+        child.append(current)
+        i = unvisited_index[current]
+        last = unvisited.pop()
+        if last != current:
+            unvisited[i] = last
+            unvisited_index[last] = i
+        if not unvisited:
+            break
+
+        for neighbour in adjacency[current]:
+            adjacency[neighbour].discard(current)
+
+        if adjacency[current]:
+            # Every edge set holds at most 4 cities, so this is constant time
+            fewest = min(len(adjacency[neighbour]) for neighbour in adjacency[current])
+            current = choice([neighbour for neighbour in adjacency[current] if len(adjacency[neighbour]) == fewest])
+        else:
+            current = unvisited[randrange(len(unvisited))]
+    return child
+
+def edge_recombination_crossover(a: Genome, b: Genome, probability: float = 0.5, validate: bool = True, report_changes: bool = False) -> Tuple[Genome, Genome]:
+    if validate:
+        _check_integer_permutations(a, b)
+
+    length = len(a)
+    if length < 2:
+        return _with_changes(a, b, a, b, report_changes)
+
+    if random() <= probability:
+        return _with_changes(a, b, _edge_recombination_child(a, b), _edge_recombination_child(b, a), report_changes)
+    else:
+        return _with_changes(a, b, a, b, report_changes)
+
+
+# --- ARRAY POPULATION CROSSOVERS ---
+# Parents are stacked into arrays (axis 0 is the pair), so a single call breeds every pair of a generation.
+# Genomes can have any shape, e.g. (pairs, rows, cols) for grid problems.
+def uniform_crossover_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, probability: float = 0.5) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    if parents_a.shape != parents_b.shape:
+        raise ValueError("Genomes must have the same dimensions.")
+
+    crossing = rng.random(len(parents_a)) <= probability
+    mask = rng.random(parents_a.shape) < 0.5
+    mask &= crossing.reshape((-1,) + (1,) * (parents_a.ndim - 1)) # Pairs that don't cross keep their parents
+
+    return np.where(mask, parents_b, parents_a), np.where(mask, parents_a, parents_b)
+
+
+# Timetables: (pairs, 2, classes) arrays. Like uniform_crossover on ScheduledClass genes, a class keeps its room and timeslot together.
+def timetable_crossover_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, probability: float = 0.5) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    if parents_a.shape != parents_b.shape:
+        raise ValueError("Genomes must have the same dimensions.")
+
+    crossing = rng.random(len(parents_a)) <= probability
+    mask = (rng.random((len(parents_a), 1, parents_a.shape[2])) < 0.5) & crossing[:, None, None]
+    return np.where(mask, parents_b, parents_a), np.where(mask, parents_a, parents_b)
+
+# Permutation genomes: parents are (pairs, n) arrays where every row is a permutation of 0..n-1.
+# Same children as order_crossover, every pair gets its own segment.
+def order_crossover_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, probability: float = 0.5) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    if parents_a.shape != parents_b.shape:
+        raise ValueError("Genomes must have the same dimensions.")
+
+    pairs, length = parents_a.shape
+    if length < 2:
+        return parents_a.copy(), parents_b.copy()
+
+    crossing = rng.random(pairs) <= probability
+    # Two distinct cut points, sorted, like sorted(sample(range(length), 2)) in order_crossover
+    first = rng.integers(length, size=pairs)
+    second = rng.integers(length - 1, size=pairs)
+    second += second >= first
+    start, end = np.minimum(first, second), np.maximum(first, second)
+    rows = np.arange(pairs)[:, None]
+
+    # Rotate every row to start right after its segment: the segment becomes the tail and the filler order is left to right
+    rotation = (end[:, None] + 1 + np.arange(length)) % length
+    tail = np.arange(length) >= length - (end - start + 1)[:, None]
+
+    def child(donor, filler):
+        donor_rotated = donor[rows, rotation]
+        filler_rotated = filler[rows, rotation]
+
+        position = np.empty_like(donor)
+        position[rows, donor_rotated] = np.arange(length) # Rotated position of each gene in the donor
+        keep = ~tail[rows, position[rows, filler_rotated]]
+
+        # Every row keeps the same number of genes as it has free positions, so the row-major boolean fill stays in its row
+        result = donor_rotated.copy()
+        result[~tail] = filler_rotated[keep]
+        unrotated = np.empty_like(result)
+        unrotated[rows, rotation] = result
+        return unrotated
+
+    child_a = np.where(crossing[:, None], child(parents_a, parents_b), parents_a)
+    child_b = np.where(crossing[:, None], child(parents_b, parents_a), parents_b)
+    return child_a, child_b
+
+
+# Real valued genomes: parents are (pairs, length) float arrays, children are clipped back into the bounds
+def _crossing_pairs(parents_a: ArrayPopulation, probability: float) -> np.ndarray:
+    return (rng.random(len(parents_a)) <= probability)[:, None]
+
+def arithmetic_recombination_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, alpha: float, probability: float = 0.5) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    if not (0 <= alpha <= 1):
+        raise ValueError("Alpha must be between 0 and 1.")
+
+    crossing = _crossing_pairs(parents_a, probability)
+    child_a = alpha * parents_a + (1 - alpha) * parents_b
+    child_b = alpha * parents_b + (1 - alpha) * parents_a
+    return np.where(crossing, child_a, parents_a), np.where(crossing, child_b, parents_b)
+
+# BLX-alpha: each gene is drawn uniformly from the parents' interval stretched by alpha times its width on both sides
+def blx_alpha_crossover_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, bounds: Bounds, alpha: float = 0.5, probability: float = 0.9) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    crossing = _crossing_pairs(parents_a, probability)
+    low = np.minimum(parents_a, parents_b)
+    high = np.maximum(parents_a, parents_b)
+    spread = alpha * (high - low)
+
+    child_a = np.clip(rng.uniform(low - spread, high + spread), bounds.lower, bounds.upper)
+    child_b = np.clip(rng.uniform(low - spread, high + spread), bounds.lower, bounds.upper)
+    return np.where(crossing, child_a, parents_a), np.where(crossing, child_b, parents_b)
+
+# Simulated Binary Crossover: larger eta keeps children closer to their parents
+def simulated_binary_crossover_array(parents_a: ArrayPopulation, parents_b: ArrayPopulation, bounds: Bounds, eta: float = 15.0, probability: float = 0.9) -> Tuple[ArrayPopulation, ArrayPopulation]:
+    crossing = _crossing_pairs(parents_a, probability)
+    u = rng.random(parents_a.shape)
+    beta = np.where(u <= 0.5, (2 * u) ** (1 / (eta + 1)), (1 / (2 * (1 - u))) ** (1 / (eta + 1)))
+
+    child_a = np.clip(0.5 * ((1 + beta) * parents_a + (1 - beta) * parents_b), bounds.lower, bounds.upper)
+    child_b = np.clip(0.5 * ((1 - beta) * parents_a + (1 + beta) * parents_b), bounds.lower, bounds.upper)
+    return np.where(crossing, child_a, parents_a), np.where(crossing, child_b, parents_b)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,27 @@
 from collections import namedtuple
 
-# --- KNAPSACK ---
+# --- GENOME CHANGES ---
+
+# What an operator changed in a genome: genome[indices[k]] went from old_values[k] to new_values[k]
+# 'moves' optionally lists the moves in the order they were applied, e.g. ('swap', i, j) or ('inverse', i, j),
+# so problems can score them directly. It is None when the change isn't a sequence of known moves (e.g. after a crossover).
+Change = namedtuple('Change', ['indices', 'old_values', 'new_values', 'moves'], defaults=[None])
+
+# --- REAL VALUED GENOME ---
+
+# A real genome is a float vector with lower[i] <= genome[i] <= upper[i]
+Bounds = namedtuple('Bounds', ['lower', 'upper'])
 
+# --- TSP ---
 
+# Cities are integer ids 0..n-1, names[i] is the label of city i.
+# distance_matrix is indexed as distance_matrix[i, j] (a dense numpy array, or computed on demand for large instances)
+TSPInstance = namedtuple('TSPInstance', ['name', 'names', 'coordinates', 'distance_matrix'])
+
+# --- KNAPSACK ---
+
+# Item i has values[i] and weights[i] (numpy vectors), a genome is a 0/1 vector selecting items
+KnapsackInstance = namedtuple('KnapsackInstance', ['name', 'values', 'weights', 'capacity'])
 
 # --- TIME SCHEDULING ---
 
@@ -14,4 +33,13 @@ Group = namedtuple('Group', ['id', 'name', 'size', 'course_ids'])
 TimeSlot = namedtuple('TimeSlot', ['id', 'day', 'time'])
 
 # A single scheduled class, which will be our "Gene"
-ScheduledClass = namedtuple('ScheduledClass', ['course', 'group', 'room', 'timeslot'])
\ No newline at end of file
+ScheduledClass = namedtuple('ScheduledClass', ['course', 'group', 'room', 'timeslot'])
+
+# Static tables for the structure-of-arrays timetable. Class k is courses[class_course[k]] taught to groups[class_group[k]].
+# An array genome has shape (2, classes): genome[0] holds indices into rooms and genome[1] indices into time_slots.
+# The remaining arrays are precomputed for the penalty: teacher index and group size per class, capacity per room, avoided slots
+# and a (teachers, time_slots) mask of slots a teacher is not available in.
+TimetableProblem = namedtuple('TimetableProblem', [
+    'teachers', 'rooms', 'courses', 'groups', 'time_slots', 'class_course', 'class_group',
+    'class_teacher', 'class_size', 'room_capacity', 'bad_slot', 'teacher_unavailable'
+])
\ No newline at end of file
@@ -1,5 +1,11 @@
+from copy import copy
+from time import perf_counter
 from typing import Callable, List, Optional, Tuple, TypeVar
 
+import numpy as np
+
+from Data_Structure import Change
+
 
 # Genome == Chromosome
 # Genome = List[int]
@@ -15,8 +21,82 @@ PopulateFunc = Callable[[], Population]
 SelectionFunc = Callable[[Population, FitnessFunc], List[Genome]]
 CrossoverFunc = Callable[[Genome, Genome], Tuple[Genome, Genome]]
 MutationFunc = Callable[[Genome, int, float], Genome]
-DynamicCrossoverRate = Callable[[Genome, Genome, Population, FitnessFunc], float]
-DynamicMutationRate = Callable[[Genome, Population, FitnessFunc], float]
+DynamicCrossoverRate = Callable[[Genome, Genome, 'GenerationStats'], float]
+DynamicMutationRate = Callable[[Genome, 'GenerationStats'], float]
+DeltaFitnessFunc = Callable[..., float] # Called as delta_fitness_func(child, parent fitness, change from the parent, parent=parent) -> child fitness
+ImprovementFunc = Callable[..., Genome] # Called as improvement_func(child, deadline=...) with a time.perf_counter() deadline or None, returns the improved child
+
+# Array Population: the whole population is one contiguous numpy array and axis 0 indexes the genome.
+# A population of 2D genomes (grids) is a 3D array of shape (size, rows, cols), a population of vectors is (size, length).
+# Array operators work on every genome at once instead of looping cell by cell.
+ArrayPopulation = np.ndarray
+ArrayFitnessFunc = Callable[[ArrayPopulation], np.ndarray] # Returns one fitness value per genome
+ArrayPopulateFunc = Callable[[], ArrayPopulation]
+ArraySelectionFunc = Callable[[ArrayPopulation, np.ndarray, int], np.ndarray] # Returns parent indices of shape (pairs, 2)
+ArrayCrossoverFunc = Callable[[ArrayPopulation, ArrayPopulation], Tuple[ArrayPopulation, ArrayPopulation]]
+ArrayMutationFunc = Callable[[ArrayPopulation], ArrayPopulation]
+
+# Shared random generator for all array operators
+rng = np.random.default_rng()
+
+
+def genome_changes(parent: Genome, child: Genome) -> Change:
+    # Positions where child differs from parent
+    if child is parent:
+        return Change([], [], [], [])
+    indices = [i for i, (old, new) in enumerate(zip(parent, child)) if old != new]
+    return Change(indices, [parent[i] for i in indices], [child[i] for i in indices])
+
+def merge_changes(first: Change, second: Change) -> Change:
+    # A single change from the original genome to the result of applying 'first' and then 'second'
+    old_values = dict(zip(first.indices, first.old_values))
+    new_values = dict(zip(first.indices, first.new_values))
+    for index, old, new in zip(second.indices, second.old_values, second.new_values):
+        old_values.setdefault(index, old)
+        new_values[index] = new
+
+    indices = list(old_values)
+    moves = first.moves + second.moves if first.moves is not None and second.moves is not None else None
+    return Change(indices, [old_values[i] for i in indices], [new_values[i] for i in indices], moves)
+
+class GenerationStats:
+    """
+    Fitness summary of one generation, computed once by the engine and handed to selection and the dynamic rate callbacks.
+
+    fitness(genome) answers from the cache for every genome of the population (and any child the engine already scored),
+    so adaptive rates don't re-evaluate the best genome or the parents for every pair.
+    """
+    def __init__(self, population: Population, fitnesses: List[float], fitness_func: FitnessFunc):
+        self.fitnesses = fitnesses
+        self.max = max(fitnesses)
+        self.min = min(fitnesses)
+        self.mean = sum(fitnesses) / len(fitnesses)
+        self.std = (sum((f - self.mean) ** 2 for f in fitnesses) / len(fitnesses)) ** 0.5
+        self.fitness_func = fitness_func
+
+        # Cached genomes stay referenced here, so their ids can't be reused while the cache lives
+        self._genomes = list(population)
+        self._fitness_by_id = {id(genome): fitness for genome, fitness in zip(population, fitnesses)}
+
+    def remember(self, genome: Genome, fitness: float) -> float:
+        self._genomes.append(genome)
+        self._fitness_by_id[id(genome)] = fitness
+        return fitness
+
+    def fitness(self, genome: Genome) -> float:
+        cached = self._fitness_by_id.get(id(genome))
+        if cached is None:
+            return self.remember(genome, self.fitness_func(genome))
+        return cached
+
+
+def copy_genome(genome: Genome) -> Genome:
+    # Mutations work in place, so a child that is still its parent object gets its own copy first
+    if isinstance(genome, list):
+        if genome and isinstance(genome[0], list):
+            return [list(row) for row in genome]
+        return list(genome)
+    return copy(genome)
 
 
 def run_evolution(
@@ -28,55 +108,144 @@ def run_evolution(
         mutation_func: MutationFunc,
         generation_limit: int = 100,
         dynamic_crossover_probability: Optional[DynamicCrossoverRate] = None,
-        dynamic_mutation_probability: Optional[DynamicMutationRate] = None
+        dynamic_mutation_probability: Optional[DynamicMutationRate] = None,
+        delta_fitness_func: Optional[DeltaFitnessFunc] = None,
+        improvement_func: Optional[ImprovementFunc] = None,
+        improvement_time_budget: Optional[float] = None
 ) -> Tuple[Population, int]:
     
     population = populate_func() # Calls the partial function with no param as all params are already in it
+    fitnesses = [fitness_func(genome) for genome in population] # Every genome is scored once, then the score travels with it
 
     for generation in range(generation_limit):
-        population = sorted(population, key= lambda genome: fitness_func(genome), reverse=True) # Sorts population based on fitness in descending order
+        # Sorts population based on fitness in descending order
+        order = sorted(range(len(population)), key= lambda i: fitnesses[i], reverse=True)
+        population = [population[i] for i in order]
+        fitnesses = [fitnesses[i] for i in order]
 
         # If the fitness is above the limit, No further iteration needed
-        if fitness_func(population[0]) >= fitness_limit: # Here, fitness_func is a partial function that is working like Currying in Ruby
+        if fitnesses[0] >= fitness_limit: # Here, fitness_func is a partial function that is working like Currying in Ruby
             break
 
+        # Local search stops improving children once the generation's budget (seconds) is used up
+        deadline = perf_counter() + improvement_time_budget if improvement_time_budget is not None else None
+
+        # Max, min, mean, std and every genome's cached fitness, shared by selection, dynamic rates and the delta fitness path
+        stats = GenerationStats(population, fitnesses, fitness_func)
+
         # Elitism
         next_generation = population[0:2]
+        next_fitnesses = fitnesses[0:2]
 
         # Here, in each iteration we are creating 2 child. So in order to keep the population size same, we iterate half of the length of the population
         # As we are implementing Elitism, we are keeping 2 best genome from previous generation. So, to keep the population size same, we will generate 2 less children.
         # So, we will iterate one lesser time
         for _ in range(int(len(population) / 2) - 1): 
-            parents = selection_func(population, fitness_func)
+            parents = selection_func(population, stats.fitness)
 
             # Static Crossover Probability
             # offspring_a, offspring_b = crossover_func(parents[0], parents[1])
 
+            # With a delta fitness function, operators also report what they changed (see Data_Structure.Change)
+            crossover_args = [parents[0], parents[1]]
+
             # Dynamic Crossover Probability
             if dynamic_crossover_probability:
-                crossover_prob = dynamic_crossover_probability(parents[0], parents[1], population, fitness_func)
-                offspring_a, offspring_b = crossover_func(parents[0], parents[1], crossover_prob)
+                crossover_args.append(dynamic_crossover_probability(parents[0], parents[1], stats))
+
+            if delta_fitness_func:
+                offspring_a, offspring_b, change_a, change_b = crossover_func(*crossover_args, report_changes=True)
             else:
-                offspring_a, offspring_b = crossover_func(parents[0], parents[1])
+                offspring_a, offspring_b = crossover_func(*crossover_args)
+
+            # Don't let the mutation below change a parent (possibly an elite) in place
+            if offspring_a is parents[0] or offspring_a is parents[1]:
+                offspring_a = copy_genome(offspring_a)
+            if offspring_b is parents[0] or offspring_b is parents[1]:
+                offspring_b = copy_genome(offspring_b)
 
             # Static Mutation Probability
             # offspring_a = mutation_func(offspring_a)
             # offspring_b = mutation_func(offspring_b)
 
             # Dynamic Mutation Probability
+            mutation_kwargs_a, mutation_kwargs_b = {}, {}
             if dynamic_mutation_probability:
-                mutation_prob_a = dynamic_mutation_probability(offspring_a, population, fitness_func)
-                mutation_prob_b = dynamic_mutation_probability(offspring_b, population, fitness_func)
-                offspring_a = mutation_func(offspring_a, probability= mutation_prob_a)
-                offspring_b = mutation_func(offspring_b, probability= mutation_prob_b)
+                # A child's fitness before mutation comes from its parent's with the delta path, otherwise it is evaluated once
+                if delta_fitness_func:
+                    stats.remember(offspring_a, delta_fitness_func(offspring_a, stats.fitness(parents[0]), change_a, parent=parents[0]))
+                    stats.remember(offspring_b, delta_fitness_func(offspring_b, stats.fitness(parents[1]), change_b, parent=parents[1]))
+                mutation_kwargs_a['probability'] = dynamic_mutation_probability(offspring_a, stats)
+                mutation_kwargs_b['probability'] = dynamic_mutation_probability(offspring_b, stats)
+
+            if delta_fitness_func:
+                offspring_a, mutation_change_a = mutation_func(offspring_a, report_changes=True, **mutation_kwargs_a)
+                offspring_b, mutation_change_b = mutation_func(offspring_b, report_changes=True, **mutation_kwargs_b)
+            else:
+                offspring_a = mutation_func(offspring_a, **mutation_kwargs_a)
+                offspring_b = mutation_func(offspring_b, **mutation_kwargs_b)
+
+            # Memetic step: improve the children with local search while this generation's time budget lasts
+            improved_a = improved_b = False
+            if improvement_func and (deadline is None or perf_counter() < deadline):
+                offspring_a, improved_a = improvement_func(offspring_a, deadline=deadline), True
+            if improvement_func and (deadline is None or perf_counter() < deadline):
+                offspring_b, improved_b = improvement_func(offspring_b, deadline=deadline), True
+
+            # The child is scored from its parent's cached fitness and everything that changed since,
+            # unless local search moved it further than the reported changes
+            if delta_fitness_func and not improved_a:
+                fitness_a = delta_fitness_func(offspring_a, stats.fitness(parents[0]), merge_changes(change_a, mutation_change_a), parent=parents[0])
             else:
-                offspring_a = mutation_func(offspring_a)
-                offspring_b = mutation_func(offspring_b)
+                fitness_a = fitness_func(offspring_a)
+            if delta_fitness_func and not improved_b:
+                fitness_b = delta_fitness_func(offspring_b, stats.fitness(parents[1]), merge_changes(change_b, mutation_change_b), parent=parents[1])
+            else:
+                fitness_b = fitness_func(offspring_b)
 
             next_generation += [offspring_a, offspring_b]
+            next_fitnesses += [fitness_a, fitness_b]
 
         population = next_generation
+        fitnesses = next_fitnesses
+
+    order = sorted(range(len(population)), key= lambda i: fitnesses[i], reverse=True)
+    population = [population[i] for i in order]
+
+    return population, generation # generation is the number of iteration that executed
+
+
+def run_array_evolution(
+        populate_func: ArrayPopulateFunc,
+        fitness_func: ArrayFitnessFunc,
+        fitness_limit: float,
+        selection_func: ArraySelectionFunc,
+        crossover_func: ArrayCrossoverFunc,
+        mutation_func: ArrayMutationFunc,
+        generation_limit: int = 100
+) -> Tuple[ArrayPopulation, int]:
+    # Same loop as run_evolution, but every step handles the whole population as one array.
+    # fitness_func scores all genomes in one call, selection returns index pairs and crossover / mutation take stacked parents.
+    population = populate_func()
+
+    for generation in range(generation_limit):
+        fitness = fitness_func(population)
+        order = np.argsort(-fitness, kind='stable')
+        population, fitness = population[order], fitness[order]
+
+        if fitness[0] >= fitness_limit:
+            break
+
+        # Elitism: keep the best 2 and breed the rest of the population
+        pairs = len(population) // 2 - 1
+        parents = selection_func(population, fitness, pairs)
+        offspring_a, offspring_b = crossover_func(population[parents[:, 0]], population[parents[:, 1]])
+        offspring_a = mutation_func(offspring_a)
+        offspring_b = mutation_func(offspring_b)
+
+        population = np.concatenate([population[0:2], offspring_a, offspring_b])
 
-    population = sorted(population, key= lambda genome: fitness_func(genome), reverse=True)
+    fitness = fitness_func(population)
+    population = population[np.argsort(-fitness, kind='stable')]
 
-    return population, generation # generation is the number of iteration that executed
\ No newline at end of file
+    return population, generation
@@ -2,16 +2,22 @@ import math
 import time
 from functools import partial
 
-from Evolution import run_evolution
-from Population import generate_binary_population
-from Crossover import single_point_crossover
-from Mutation import bit_flip_mutation
-from Selection import roulette_wheel_selection, roulette_wheel_selection_positive
+import numpy as np
+
+from Evolution import ArrayPopulation, run_evolution, run_array_evolution
+from Data_Structure import Bounds
+from Population import generate_binary_population, generate_real_population, generate_latin_hypercube_population, opposition_based, reporting_diversity
+from Crossover import single_point_crossover, simulated_binary_crossover_array, blx_alpha_crossover_array
+from Mutation import bit_flip_mutation, polynomial_mutation_array, gaussian_mutation_array
+from Selection import roulette_wheel_selection, roulette_wheel_selection_positive, tournament_selection_array
 
 GENOME_LENGTH = 20
 RANGE_MIN = -10.0
 RANGE_MAX = 31.0
 
+# Real valued genome: x itself is the single gene, no binary encoding needed
+BOUNDS = Bounds(lower=[RANGE_MIN], upper=[RANGE_MAX])
+
 def func1(x: float) -> float:
     return math.sin(10 * math.pi * x) * x + 2.0
 
@@ -36,17 +42,33 @@ def calculate_fitness(genome: list[int]) -> float:
     x = decode_genome(genome)
     return func2(x)
 
+def calculate_fitness_real(population: ArrayPopulation) -> np.ndarray:
+    return func2(population[:, 0])
+
 
 if __name__ == "__main__":
 
     start_time = time.time()
 
-    population, generations = run_evolution(
-        populate_func=partial(generate_binary_population, size=50, genome_length=GENOME_LENGTH),
-        fitness_func=calculate_fitness,
-        selection_func=roulette_wheel_selection_positive,
-        crossover_func=single_point_crossover,
-        mutation_func=partial(bit_flip_mutation, probability=0.05),
+    # population, generations = run_evolution(
+    #     populate_func=partial(generate_binary_population, size=50, genome_length=GENOME_LENGTH),
+    #     fitness_func=calculate_fitness,
+    #     selection_func=roulette_wheel_selection_positive,
+    #     crossover_func=single_point_crossover,
+    #     mutation_func=partial(bit_flip_mutation, probability=0.05),
+    #     fitness_limit=1000.0,
+    #     generation_limit=200
+    # )
+
+    population, generations = run_array_evolution(
+        # populate_func=partial(generate_real_population, size=50, bounds=BOUNDS),
+        populate_func=reporting_diversity(opposition_based(partial(generate_latin_hypercube_population, size=50, bounds=BOUNDS), calculate_fitness_real, BOUNDS), "latin hypercube + opposition", BOUNDS),
+        fitness_func=calculate_fitness_real,
+        selection_func=tournament_selection_array,
+        crossover_func=partial(simulated_binary_crossover_array, bounds=BOUNDS),
+        # crossover_func=partial(blx_alpha_crossover_array, bounds=BOUNDS, alpha=0.5),
+        mutation_func=partial(polynomial_mutation_array, bounds=BOUNDS),
+        # mutation_func=partial(gaussian_mutation_array, bounds=BOUNDS, sigma=0.05),
         fitness_limit=1000.0,
         generation_limit=200
     )
@@ -55,8 +77,8 @@ if __name__ == "__main__":
 
     best_genome = population[0]
 
-    best_x = decode_genome(best_genome)
-    max_y = calculate_fitness(best_genome)
+    best_x = best_genome[0]
+    max_y = func2(best_x)
 
     print(f"\nEvolution finished in {generations} generations.")
     print(f"Time taken: {end_time - start_time:.2f} seconds")
@@ -0,0 +1,95 @@
+from functools import partial
+import time
+from typing import Callable, Optional
+
+import numpy as np
+
+from Data_Structure import KnapsackInstance
+from Evolution import ArrayPopulation, run_array_evolution
+from Population import generate_binary_population_array
+from Selection import tournament_selection_array
+from Crossover import uniform_crossover_array
+from Mutation import bit_flip_mutation_per_gene_array
+from Knapsack_Modular import Thing
+from Seed_Store import SeedStore, problem_fingerprint, seeded
+
+
+def instance_from_things(things: list[Thing], weight_limit: int, name: str = 'things') -> KnapsackInstance:
+    return KnapsackInstance(
+        name=name,
+        values=np.array([thing.value for thing in things], dtype=np.int64),
+        weights=np.array([thing.weight for thing in things], dtype=np.int64),
+        capacity=weight_limit
+    )
+
+
+# FITNESS
+# Same score as Knapsack_Modular.fitness for a whole (size, n) population: total value, or 0 when overweight
+def fitness_array(population: ArrayPopulation, instance: KnapsackInstance) -> np.ndarray:
+    values = population @ instance.values
+    weights = population @ instance.weights
+    return np.where(weights <= instance.capacity, values, 0)
+
+
+# REPAIR
+# Items by decreasing value per unit of weight, sorted once per instance
+def density_order(instance: KnapsackInstance) -> np.ndarray:
+    density = instance.values / np.maximum(instance.weights, 1e-12)
+    return np.argsort(-density, kind='stable')
+
+# Drops the selected items with the lowest value density until every genome fits.
+# What is left is the longest run of selected items (in density order) that fits, so one cumulative sum repairs the whole population.
+def repair_array(population: ArrayPopulation, instance: KnapsackInstance, order: Optional[np.ndarray] = None) -> ArrayPopulation:
+    if order is None:
+        order = density_order(instance)
+
+    selected = population[:, order].astype(bool)
+    carried = np.cumsum(selected * instance.weights[order], axis=1)
+    population[:, order] = selected & (carried <= instance.capacity)
+    return population
+
+# Wraps a populate or mutation function so every genome it returns is repaired
+def repaired(func: Callable[..., ArrayPopulation], instance: KnapsackInstance) -> Callable[..., ArrayPopulation]:
+    order = density_order(instance)
+    return lambda *args, **kwargs: repair_array(func(*args, **kwargs), instance, order)
+
+
+if __name__ == "__main__":
+    things = [
+        Thing('Laptop', 500, 2200),
+        Thing('Headphones', 150, 160),
+        Thing('Coffee Mug', 60, 350),
+        Thing('Notepad', 40, 333),
+        Thing('Water Bottle', 30, 192),
+        Thing('Phone', 500, 200),
+        Thing('Baseball Cap', 100, 70),
+        Thing('Mint', 5, 25),
+        Thing('Socks', 10, 38)
+    ]
+    instance = instance_from_things(things, weight_limit= 3000)
+
+    # Elites of earlier runs on this instance start the population
+    store = SeedStore()
+    fingerprint = problem_fingerprint(instance, 'binary')
+
+    start_time = time.time()
+    population, generation = run_array_evolution(
+        populate_func= repaired(seeded(partial(generate_binary_population_array, size= 10, genome_length= len(things)), store, fingerprint), instance),
+        selection_func= tournament_selection_array,
+        crossover_func= uniform_crossover_array,
+        mutation_func= repaired(partial(bit_flip_mutation_per_gene_array, probability= 0.1), instance),
+        fitness_func= partial(fitness_array, instance= instance),
+        fitness_limit= 1310,
+        generation_limit= 100
+    )
+    end_time = time.time()
+    store.update(fingerprint, population, fitness_array(population, instance))
+
+    best_genome = population[0]
+    print(f"\nGenerations: {generation}")
+    print(f"Time: {end_time - start_time}s")
+    print(f"Best solution fitness: {fitness_array(population[:1], instance)[0]}")
+    print(f"Best solution weight: {best_genome @ instance.weights}/{instance.capacity}")
+    print("Items in knapsack:")
+    for i in np.flatnonzero(best_genome):
+        print(f"- {things[i].name} (Value: {things[i].value}, Weight: {things[i].weight})")
@@ -0,0 +1,217 @@
+from bisect import bisect_right
+from functools import partial
+from itertools import islice
+import time
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+from Data_Structure import KnapsackInstance
+from Evolution import ArrayFitnessFunc, ArrayPopulation, run_array_evolution, rng
+
+
+# --- INSTANCE GENERATOR ---
+# The classic test classes: weights are uniform in [1, R] and the values follow the weights more and more closely.
+# Correlated classes are much harder, because value density hardly separates good items from bad ones.
+
+KNAPSACK_CLASSES = ['uncorrelated', 'weakly_correlated', 'strongly_correlated', 'subset_sum']
+
+def generate_instance(n: int, kind: str = 'uncorrelated', R: int = 1000, capacity_ratio: float = 0.5, seed: Optional[int] = None) -> KnapsackInstance:
+    generator = np.random.default_rng(seed) if seed is not None else rng
+    weights = generator.integers(1, R + 1, size=n, dtype=np.int64)
+
+    if kind == 'uncorrelated':
+        values = generator.integers(1, R + 1, size=n, dtype=np.int64)
+    elif kind == 'weakly_correlated':
+        values = np.maximum(weights + generator.integers(-(R // 10), R // 10 + 1, size=n, dtype=np.int64), 1)
+    elif kind == 'strongly_correlated':
+        values = weights + R // 10
+    elif kind == 'subset_sum':
+        values = weights.copy()
+    else:
+        raise ValueError(f"Unknown knapsack instance class: {kind}")
+
+    return KnapsackInstance(
+        name=f"{kind}_{n}",
+        values=values,
+        weights=weights,
+        capacity=int(capacity_ratio * weights.sum())
+    )
+
+
+# --- FILES ---
+# Plain text: a header line 'n capacity', then one 'value weight' line per item.
+
+def save_instance(instance: KnapsackInstance, path: str, chunk_size: int = 1_000_000) -> None:
+    with open(path, 'w') as file:
+        file.write(f"{len(instance.values)} {instance.capacity}\n")
+        for start in range(0, len(instance.values), chunk_size):
+            items = np.column_stack([instance.values[start:start + chunk_size], instance.weights[start:start + chunk_size]])
+            np.savetxt(file, items, fmt='%d')
+
+# Streams the items into preallocated arrays chunk by chunk, so millions of items never exist as Python objects at once
+def load_instance(path: str, chunk_size: int = 1_000_000) -> KnapsackInstance:
+    with open(path) as file:
+        n, capacity = (int(field) for field in file.readline().split())
+        values = np.empty(n, dtype=np.int64)
+        weights = np.empty(n, dtype=np.int64)
+
+        loaded = 0
+        while loaded < n:
+            items = np.loadtxt(islice(file, min(chunk_size, n - loaded)), dtype=np.int64, ndmin=2)
+            if len(items) == 0:
+                raise ValueError(f"Expected {n} items in {path}, found {loaded}.")
+            values[loaded:loaded + len(items)] = items[:, 0]
+            weights[loaded:loaded + len(items)] = items[:, 1]
+            loaded += len(items)
+
+    return KnapsackInstance(name=path, values=values, weights=weights, capacity=capacity)
+
+
+# --- REFERENCE SOLUTIONS ---
+
+# Dynamic programming over the capacity: exact, O(n * capacity) time and O(capacity) memory
+def solve_dp(instance: KnapsackInstance) -> int:
+    capacity = int(instance.capacity)
+    best = np.zeros(capacity + 1, dtype=np.int64) # best[c] = best value with total weight <= c
+    for value, weight in zip(instance.values.tolist(), instance.weights.tolist()):
+        if weight == 0:
+            best += value
+        elif weight <= capacity:
+            # The right side is evaluated before the assignment, so every item is used at most once
+            best[weight:] = np.maximum(best[weight:], best[:-weight] + value)
+    return int(best[capacity])
+
+# Dantzig's bound: the LP relaxation fills the knapsack greedily by value density and takes a fraction of the first item that doesn't fit
+def _density_sorted(instance: KnapsackInstance) -> Tuple[np.ndarray, np.ndarray]:
+    density = instance.values / np.maximum(instance.weights, 1e-12)
+    order = np.argsort(-density, kind='stable')
+    return instance.values[order], instance.weights[order]
+
+def dantzig_bound(instance: KnapsackInstance) -> float:
+    values, weights = _density_sorted(instance)
+    carried = np.cumsum(weights)
+    k = int(np.searchsorted(carried, instance.capacity, side='right')) # Items 0..k-1 fit completely
+    bound = float(values[:k].sum())
+    if k < len(values):
+        bound += (instance.capacity - (carried[k - 1] if k else 0)) * values[k] / weights[k]
+    return bound
+
+def solve_branch_and_bound(instance: KnapsackInstance, time_limit: float = 60.0) -> Tuple[int, bool]:
+    """
+    Depth-first branch and bound over the items in density order, pruning with Dantzig's bound.
+
+    Prefix sums make every bound a binary search, so a node costs O(log n). Returns the best value found
+    and whether it is proven optimal (False when the time limit stopped the search).
+    """
+    values, weights = _density_sorted(instance)
+    n = len(values)
+    value_prefix = np.concatenate([[0], np.cumsum(values)]).tolist()
+    weight_prefix = np.concatenate([[0], np.cumsum(weights)]).tolist()
+    values, weights = values.tolist(), weights.tolist()
+    deadline = time.perf_counter() + time_limit
+
+    best = 0
+    stack = [(0, 0, 0)] # (next item, value, weight)
+    nodes = 0
+    while stack:
+        nodes += 1
+        if nodes % 4096 == 0 and time.perf_counter() > deadline:
+            return best, False
+
+        i, value, weight = stack.pop()
+        best = max(best, value)
+        room = instance.capacity - weight
+
+        # Items i..j-1 fit completely, j is the item split by the bound
+        j = bisect_right(weight_prefix, weight_prefix[i] + room) - 1
+        greedy = value + value_prefix[j] - value_prefix[i]
+        if j >= n: # Everything left fits
+            best = max(best, greedy)
+            continue
+        bound = greedy + (room - (weight_prefix[j] - weight_prefix[i])) * values[j] / weights[j]
+        if int(bound) <= best: # Values are integers
+            continue
+
+        stack.append((i + 1, value, weight))
+        if weights[i] <= room:
+            stack.append((i + 1, value + values[i], weight + weights[i])) # Taking the item is explored first
+    return best, True
+
+def reference_solution(instance: KnapsackInstance, dp_limit: float = 2e8, time_limit: float = 60.0) -> Tuple[int, bool]:
+    # Exact DP while n * capacity stays small, branch and bound (possibly stopped by the time limit) above that
+    if len(instance.values) * instance.capacity <= dp_limit:
+        return solve_dp(instance), True
+    return solve_branch_and_bound(instance, time_limit)
+
+def optimality_gap(value: float, reference: float) -> float:
+    return (reference - value) / reference if reference else 0.0
+
+
+# --- GAP TRACKING ---
+
+class GapTracker:
+    """
+    Wraps an array fitness function and records the best fitness seen after every call,
+    so a run can report how long it took to come within a given gap of the reference value.
+    """
+    def __init__(self, fitness_func: ArrayFitnessFunc, reference: float):
+        self.fitness_func = fitness_func
+        self.reference = reference
+        self.start_time = time.perf_counter()
+        self.best = -np.inf
+        self.history: List[Tuple[float, float]] = [] # (seconds since start, best fitness so far)
+
+    def __call__(self, population: ArrayPopulation) -> np.ndarray:
+        fitness = self.fitness_func(population)
+        if fitness.max() > self.best:
+            self.best = float(fitness.max())
+            self.history.append((time.perf_counter() - self.start_time, self.best))
+        return fitness
+
+    def gap(self) -> float:
+        return optimality_gap(self.best, self.reference)
+
+    # Seconds until the best fitness first came within 'gap' of the reference, None if it never did
+    def time_to_gap(self, gap: float) -> Optional[float]:
+        for seconds, best in self.history:
+            if optimality_gap(best, self.reference) <= gap:
+                return seconds
+        return None
+
+
+if __name__ == "__main__":
+    from Knapsack_Array import fitness_array, repaired
+    from Population import generate_binary_population_array, generate_greedy_knapsack_population_array, reporting_diversity
+    from Selection import tournament_selection_array
+    from Crossover import uniform_crossover_array
+    from Mutation import bit_flip_mutation_per_gene_array
+    from Seed_Store import SeedStore, problem_fingerprint, seeded
+
+    store = SeedStore()
+
+    for kind in KNAPSACK_CLASSES:
+        instance = generate_instance(10_000, kind, seed= 1)
+
+        start_time = time.perf_counter()
+        reference, optimal = reference_solution(instance, time_limit= 10.0)
+        print(f"\n{instance.name}: reference {reference} ({'optimal' if optimal else 'best found'}) in {time.perf_counter() - start_time:.2f}s")
+
+        fingerprint = problem_fingerprint(instance, 'binary')
+        tracker = GapTracker(partial(fitness_array, instance= instance), reference)
+        population, generation = run_array_evolution(
+            # populate_func= repaired(seeded(partial(generate_binary_population_array, size= 100, genome_length= len(instance.values)), store, fingerprint), instance),
+            populate_func= repaired(seeded(reporting_diversity(partial(generate_greedy_knapsack_population_array, size= 100, instance= instance), "greedy fills"), store, fingerprint), instance),
+            selection_func= tournament_selection_array,
+            crossover_func= uniform_crossover_array,
+            mutation_func= repaired(partial(bit_flip_mutation_per_gene_array, probability= 1 / len(instance.values)), instance),
+            fitness_func= tracker,
+            fitness_limit= reference,
+            generation_limit= 200
+        )
+        store.update(fingerprint, population, fitness_array(population, instance))
+
+        print(f"GA best {tracker.best:.0f} after {generation} generations, gap {tracker.gap():.4%}")
+        for gap in (0.05, 0.01, 0.001):
+            seconds = tracker.time_to_gap(gap)
+            print(f"  time to {gap:.1%} gap: {'-' if seconds is None else f'{seconds:.3f}s'}")
@@ -1,10 +1,12 @@
 from functools import partial
 
-from Evolution import Genome, run_evolution
-from Population import generate_matrix_population
-from Selection import roulette_wheel_selection, random_selection, rank_selection
-from Crossover import single_point_crossover, uniform_crossover_2d
-from Mutation import random_resetting, random_resetting_2d, swap_mutation
+import numpy as np
+
+from Evolution import Genome, ArrayPopulation, run_evolution, run_array_evolution
+from Population import generate_matrix_population, generate_grid_population
+from Selection import roulette_wheel_selection, random_selection, rank_selection, rank_selection_array
+from Crossover import single_point_crossover, uniform_crossover_2d, uniform_crossover_array
+from Mutation import random_resetting, random_resetting_2d, swap_mutation, random_resetting_array
 
 def fitness(genome: Genome) -> int:
     score = 0
@@ -43,6 +45,23 @@ def fitness(genome: Genome) -> int:
                 
     return score
 
+# Every cell except the top corners must match this grid. The top corners score as a pair ('M' and 'L' in either order).
+TARGET = np.array([
+    ['', 'X', 'X', 'X', ''],
+    ['X', 'I', 'X', 'I', 'X'],
+    ['X', 'X', 'G', 'X', 'X'],
+    ['X', 'H', 'X', 'H', 'X'],
+    ['T', 'X', 'X', 'X', 'T']
+])
+
+# Same score as fitness, for a whole (size, 5, 5) population at once
+def fitness_array(population: ArrayPopulation) -> np.ndarray:
+    score = np.count_nonzero(population == TARGET, axis=(1, 2))
+
+    left, right = population[:, 0, 0], population[:, 0, 4]
+    corners = ((left == 'M') & (right == 'L')) | ((left == 'L') & (right == 'M'))
+    return score + 2 * corners
+
 
 
 if __name__ == "__main__":
@@ -56,12 +75,22 @@ if __name__ == "__main__":
 
     chars = ['M', 'L', 'I', 'G', 'H', 'T', 'X']
 
-    population, generation = run_evolution(
-        populate_func= partial(generate_matrix_population, size= 100, list = chars, mat_size = 5),
-        selection_func= rank_selection,
-        crossover_func= uniform_crossover_2d,
-        mutation_func= partial(random_resetting_2d, allowed_values= chars),
-        fitness_func= partial(fitness),
+    # population, generation = run_evolution(
+    #     populate_func= partial(generate_matrix_population, size= 100, list = chars, mat_size = 5),
+    #     selection_func= rank_selection,
+    #     crossover_func= uniform_crossover_2d,
+    #     mutation_func= partial(random_resetting_2d, allowed_values= chars),
+    #     fitness_func= partial(fitness),
+    #     fitness_limit= 25,
+    #     generation_limit= 1000
+    # )
+
+    population, generation = run_array_evolution(
+        populate_func= partial(generate_grid_population, size= 100, rows= 5, cols= 5, list= chars),
+        selection_func= rank_selection_array,
+        crossover_func= uniform_crossover_array,
+        mutation_func= partial(random_resetting_array, allowed_values= chars),
+        fitness_func= fitness_array,
         fitness_limit= 25,
         generation_limit= 1000
     )
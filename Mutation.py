@@ -1,19 +1,39 @@
+from math import log
 from random import random, randrange, choice, shuffle
+from typing import Iterator
 
-from Evolution import Genome
+import numpy as np
+
+from Evolution import Genome, ArrayPopulation, rng
+from Data_Structure import Bounds, Change
 
 
 # MUTATION
+# Called with report_changes=True, the list mutations return (genome, Change) so the fitness can be updated incrementally.
+# 'touched' keeps the original value of every index the mutation writes to.
+def _remember(genome: Genome, touched: dict, indices) -> None:
+    for index in indices:
+        touched.setdefault(index, genome[index])
+
+def _reported(genome: Genome, touched: dict, report_changes: bool, moves: list = None):
+    if not report_changes:
+        return genome
+    indices = list(touched)
+    return genome, Change(indices, [touched[i] for i in indices], [genome[i] for i in indices], moves)
+
 # Flipping a bit with a probability
-def bit_flip_mutation(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
+def bit_flip_mutation(genome: Genome, num: int = 1, probability: float = 0.5, report_changes: bool = False) -> Genome:
+    touched = {}
     for _ in range(num):
         if random() <= probability:
             index = randrange(len(genome))
                         # <value_if_true> if (<condition>) else <value_if_false>
             # genome[index] = genome[index] if random() > probability else (genome[index] ^ 1)
+            if report_changes:
+                _remember(genome, touched, (index,))
             genome[index] ^= 1
 
-    return genome
+    return _reported(genome, touched, report_changes)
 
 def bit_flip_mutation_2d(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
     for _ in range(num):
@@ -27,36 +47,77 @@ def bit_flip_mutation_2d(genome: Genome, num: int = 1, probability: float = 0.5)
     return genome
 
 # Randomly assign value from an acceptable list
-def random_resetting(genome: Genome, allowed_values: list, num: int = 1, probability: float = 0.5) -> Genome:
+def random_resetting(genome: Genome, allowed_values: list, num: int = 1, probability: float = 0.5, report_changes: bool = False) -> Genome:
+    touched = {}
     for _ in range(num):
         if random() <= probability:
             index = randrange(len(genome))
             # print(index)
                         # <value_if_true> if (<condition>) else <value_if_false>
             # genome[index] = genome[index] if random() > probability else (genome[index] ^ 1)
+            if report_changes:
+                _remember(genome, touched, (index,))
             genome[index] = allowed_values[randrange(len(allowed_values))]
 
-    return genome
+    return _reported(genome, touched, report_changes)
 
 def random_resetting_2d(genome: Genome, allowed_values: list, num: int = 1, probability: float = 0.05) -> Genome:
-    rows, cols = len(genome), len(genome[0])
+    cols = len(genome[0])
     for _ in range(num):
-        for i in range(rows):
-            for j in range(cols):
-                if random() < probability:
-                    genome[i][j] = choice(allowed_values)
+        for cell in mutated_positions(len(genome) * cols, probability):
+            genome[cell // cols][cell % cols] = choice(allowed_values)
     return genome
 
+
+# --- PER GENE MUTATION ---
+# Every gene mutates independently with 'probability'. Instead of calling random() per gene, the gap to the next
+# mutated gene is drawn from a geometric distribution, so the cost scales with the number of mutations, not the genome length.
+def mutated_positions(length: int, probability: float) -> Iterator[int]:
+    if probability <= 0:
+        return
+    if probability >= 1:
+        yield from range(length)
+        return
+
+    log_keep = log(1.0 - probability)
+    position = -1
+    while True:
+        position += 1 + int(log(1.0 - random()) / log_keep) # Number of untouched genes before the next mutation
+        if position >= length:
+            return
+        yield position
+
+def bit_flip_mutation_per_gene(genome: Genome, probability: float = 0.01, report_changes: bool = False) -> Genome:
+    touched = {}
+    for index in mutated_positions(len(genome), probability):
+        if report_changes:
+            _remember(genome, touched, (index,))
+        genome[index] ^= 1
+    return _reported(genome, touched, report_changes)
+
+def random_resetting_per_gene(genome: Genome, allowed_values: list, probability: float = 0.01, report_changes: bool = False) -> Genome:
+    touched = {}
+    for index in mutated_positions(len(genome), probability):
+        if report_changes:
+            _remember(genome, touched, (index,))
+        genome[index] = choice(allowed_values)
+    return _reported(genome, touched, report_changes)
+
 # Swap 2 random element from a Genome
-def swap_mutation(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
+def swap_mutation(genome: Genome, num: int = 1, probability: float = 0.5, report_changes: bool = False) -> Genome:
+    touched = {}
+    moves = []
     for _ in range(num):
         if random() <= probability:
             index1 = randrange(len(genome))
             index2 = randrange(len(genome))
 
+            if report_changes:
+                _remember(genome, touched, (index1, index2))
+                moves.append(('swap', index1, index2))
             genome[index1], genome[index2] = genome[index2], genome[index1]
 
-    return genome
+    return _reported(genome, touched, report_changes, moves)
 
 def swap_mutation_2d(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
     for _ in range(num):
@@ -70,7 +131,8 @@ def swap_mutation_2d(genome: Genome, num: int = 1, probability: float = 0.5) ->
 
     return genome
 
-def scramble_mutation(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
+def scramble_mutation(genome: Genome, num: int = 1, probability: float = 0.5, report_changes: bool = False) -> Genome:
+    touched = {}
     for _ in range(num):
         if random() <= probability:
             index1 = randrange(len(genome))
@@ -79,16 +141,18 @@ def scramble_mutation(genome: Genome, num: int = 1, probability: float = 0.5) ->
             if(index1>index2):
                 index1, index2 = index2, index1
 
-            print(index1, index2)
+            if report_changes:
+                _remember(genome, touched, range(index1, index2+1))
             sub_genome = genome[index1:index2+1]
             shuffle(sub_genome)
             genome[index1:index2+1] = sub_genome
-            print(genome)
 
-    return genome
+    return _reported(genome, touched, report_changes)
 
 # Inverse a sub section and set it in the genome
-def inverse_mutation(genome: Genome, num: int = 1, probability: float = 0.5) -> Genome:
+def inverse_mutation(genome: Genome, num: int = 1, probability: float = 0.5, report_changes: bool = False) -> Genome:
+    touched = {}
+    moves = []
     for _ in range(num):
         if random() <= probability:
             index1 = randrange(len(genome))
@@ -97,11 +161,13 @@ def inverse_mutation(genome: Genome, num: int = 1, probability: float = 0.5) ->
             if(index1>index2):
                 index1, index2 = index2, index1
 
-            print(index1, index2)
+            if report_changes:
+                _remember(genome, touched, range(index1, index2+1))
+                moves.append(('inverse', index1, index2))
             reversed_sublist = genome[index1:index2+1][::-1]
             genome[index1:index2+1] = reversed_sublist
 
-    return genome
+    return _reported(genome, touched, report_changes, moves)
 
 
             
@@ -109,16 +175,18 @@ def inverse_mutation(genome: Genome, num: int = 1, probability: float = 0.5) ->
 
 
 
-def timetable_mutation(genome: Genome, rooms: list, time_slots: list, probability: float = 0.1) -> Genome:
+def timetable_mutation(genome: Genome, rooms: list, time_slots: list, probability: float = 0.1, report_changes: bool = False) -> Genome:
     """
     Mutates a timetable by randomly re-assigning a class's room or timeslot.
     """
+    touched = {}
     if random() > probability:
-        return genome # No mutation
+        return _reported(genome, touched, report_changes) # No mutation
 
     # Select a random class in the timetable to mutate
     index = randrange(len(genome))
     scheduled_class = genome[index]
+    touched[index] = scheduled_class
 
     # Flip a coin to decide whether to change the room or the timeslot
     if random() < 0.5:
@@ -130,7 +198,96 @@ def timetable_mutation(genome: Genome, rooms: list, time_slots: list, probabilit
         new_timeslot = choice(time_slots)
         genome[index] = scheduled_class._replace(timeslot=new_timeslot)
 
-    return genome 
+    return _reported(genome, touched, report_changes)
+
+
+# --- ARRAY POPULATION MUTATIONS ---
+# Mutate every genome of a stacked population in one call. Cells are addressed through a flat (size, cells) view,
+# so the same functions handle grids and vectors.
+# Flat indices of the mutated cells of a whole population, drawn as cumulative geometric gaps in a few vectorized calls
+def mutated_positions_array(total: int, probability: float) -> np.ndarray:
+    if probability <= 0:
+        return np.empty(0, dtype=np.int64)
+    if probability >= 1:
+        return np.arange(total)
+
+    expected = total * probability
+    chunk = int(expected + 4 * np.sqrt(expected) + 16)
+    positions = []
+    last = -1
+    while last < total:
+        candidates = last + np.cumsum(rng.geometric(probability, size=chunk))
+        positions.append(candidates[candidates < total])
+        last = candidates[-1]
+    return np.concatenate(positions)
+
+def random_resetting_array(population: ArrayPopulation, allowed_values: list, probability: float = 0.05) -> ArrayPopulation:
+    flat = population.reshape(-1)
+    cells = mutated_positions_array(flat.size, probability)
+    flat[cells] = rng.choice(np.asarray(allowed_values), size=len(cells))
+    return flat.reshape(population.shape)
+
+def bit_flip_mutation_per_gene_array(population: ArrayPopulation, probability: float = 0.01) -> ArrayPopulation:
+    flat = population.reshape(-1)
+    cells = mutated_positions_array(flat.size, probability)
+    flat[cells] ^= 1
+    return flat.reshape(population.shape)
+
+def bit_flip_mutation_array(population: ArrayPopulation, num: int = 1, probability: float = 0.5) -> ArrayPopulation:
+    flat = population.reshape(len(population), -1)
+    flipping = rng.random((len(flat), num)) <= probability
+    cells = rng.integers(flat.shape[1], size=(len(flat), num))
+    rows = np.broadcast_to(np.arange(len(flat))[:, None], cells.shape)
+
+    # xor.at applies repeated picks of the same cell one after another, like the sequential loop
+    np.bitwise_xor.at(flat, (rows[flipping], cells[flipping]), 1)
+    return flat.reshape(population.shape)
+
+def swap_mutation_array(population: ArrayPopulation, num: int = 1, probability: float = 0.5) -> ArrayPopulation:
+    flat = population.reshape(len(population), -1)
+    for _ in range(num):
+        rows = np.flatnonzero(rng.random(len(flat)) <= probability)
+        index1 = rng.integers(flat.shape[1], size=len(rows))
+        index2 = rng.integers(flat.shape[1], size=len(rows))
+
+        # Each genome takes part at most once per round, so the batched swap matches the sequential one
+        flat[rows, index1], flat[rows, index2] = flat[rows, index2], flat[rows, index1]
+    return flat.reshape(population.shape)
+
+# Timetables: (size, 2, classes) arrays. Like timetable_mutation, a mutating genome moves one random class to a new room or timeslot.
+def timetable_mutation_array(population: ArrayPopulation, rooms: int, time_slots: int, probability: float = 0.1) -> ArrayPopulation:
+    genomes = np.flatnonzero(rng.random(len(population)) <= probability)
+    classes = rng.integers(population.shape[2], size=len(genomes))
+    changing_slot = rng.random(len(genomes)) >= 0.5 # Coin flip between room (row 0) and timeslot (row 1)
+
+    choices = np.where(changing_slot, rng.integers(time_slots, size=len(genomes)), rng.integers(rooms, size=len(genomes)))
+    population[genomes, changing_slot.astype(np.int64), classes] = choices
+    return population
+
+# Real valued genomes: every gene mutates with the given probability and stays inside the bounds.
+# sigma is a fraction of each gene's range.
+def gaussian_mutation_array(population: ArrayPopulation, bounds: Bounds, sigma: float = 0.1, probability: float = 0.1) -> ArrayPopulation:
+    lower, upper = np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float)
+    mask = rng.random(population.shape) < probability
+    noise = rng.normal(0.0, sigma * (upper - lower), size=population.shape)
+    return np.clip(population + mask * noise, lower, upper)
+
+# Deb's polynomial mutation: larger eta gives smaller steps, and steps shrink near the bounds
+def polynomial_mutation_array(population: ArrayPopulation, bounds: Bounds, eta: float = 20.0, probability: float = 0.1) -> ArrayPopulation:
+    lower, upper = np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float)
+    span = upper - lower
+    mask = rng.random(population.shape) < probability
+
+    delta_low = (population - lower) / span
+    delta_high = (upper - population) / span
+    r = rng.random(population.shape)
+    power = 1 / (eta + 1)
+
+    left = (2 * r + (1 - 2 * r) * (1 - delta_low) ** (eta + 1)) ** power - 1
+    right = 1 - (2 * (1 - r) + 2 * (r - 0.5) * (1 - delta_high) ** (eta + 1)) ** power
+    delta = np.where(r < 0.5, left, right)
+
+    return np.clip(population + mask * delta * span, lower, upper)
 
 if __name__ == "__main__":
     # from Population import generate_binary_genome, generate_listed_genome
@@ -1,6 +1,12 @@
-from typing import Callable, List, Tuple, Dict, TypeVar
+from typing import Callable, List, Optional, Tuple, Dict, TypeVar
+from bisect import bisect_left, bisect_right
+from concurrent.futures import Executor
 from math import inf as INFINITE
 
+import numpy as np
+
+from Evolution import DeltaFitnessFunc, copy_genome, merge_changes
+
 Genome = TypeVar('Genome')
 Population = List[Genome]
 
@@ -10,6 +16,21 @@ SelectionFunc = Callable[[Population, FitnessFunc], List[Genome]]
 CrossoverFunc = Callable[[Genome, Genome], Tuple[Genome, Genome]]
 MutationFunc = Callable[[Genome, int, float], Genome]
 
+# Row i holds the objective values of genome i, one column per fitness function (all maximised)
+Objectives = np.ndarray
+
+
+# Every genome is scored once per fitness function; sorting and crowding only read this matrix
+def evaluate_objectives(population: Population, fitness_funcs: List[FitnessFunc]) -> Objectives:
+    return np.array([[func(genome) for func in fitness_funcs] for genome in population], dtype=float).reshape(len(population), len(fitness_funcs))
+
+# Same matrix, evaluated in chunks on an executor (e.g. a ProcessPoolExecutor).
+# With processes the genomes and fitness functions must be picklable: module level functions or partials of them.
+def evaluate_objectives_parallel(population: Population, fitness_funcs: List[FitnessFunc], executor: Executor, chunk_size: int = 64) -> Objectives:
+    chunks = [population[start:start + chunk_size] for start in range(0, len(population), chunk_size)]
+    rows = list(executor.map(evaluate_objectives, chunks, [fitness_funcs] * len(chunks)))
+    return np.vstack(rows) if rows else np.empty((0, len(fitness_funcs)))
+
 def dominates(a: Genome, b: Genome, fitness_funcs: List[FitnessFunc]) -> int:
     a_fitnesses = [func(a) for func in fitness_funcs]
     b_fitnesses = [func(b) for func in fitness_funcs]
@@ -29,26 +50,36 @@ def dominates(a: Genome, b: Genome, fitness_funcs: List[FitnessFunc]) -> int:
     return 0
 
 
-def non_dominated_sort(population: Population, fitness_funcs: List[FitnessFunc]) -> List[List[int]]:
-    population_size = len(population)
+# --- NON-DOMINATED SORTING ---
+# Every sort takes the objective matrix and returns the fronts as lists of row indices (ascending), best front first.
+
+# Deb's bookkeeping algorithm: O(M*N^2) comparisons and a list of dominated genomes per genome
+def naive_non_dominated_sort(objectives: Objectives) -> List[List[int]]:
+    population_size = len(objectives)
     dominated_counts = [0]*population_size
     dominating_solutions = [[] for _ in range(population_size)]
     fronts = [[]]
 
     for i in range(population_size):
-        for j in range(i+1, population_size):
-            domination_result = dominates(population[i], population[j], fitness_funcs)
-
-            if domination_result == 1:
-                dominating_solutions[i].append(j)
-                dominated_counts[j] += 1
-            elif domination_result == -1:
-                dominating_solutions[j].append(i)
-                dominated_counts[i] += 1
+        # Compare i with every later genome at once, same rule as dominates()
+        better = (objectives[i] > objectives[i+1:]).any(axis=1)
+        worse = (objectives[i] < objectives[i+1:]).any(axis=1)
+
+        for j in np.flatnonzero(better & ~worse).tolist():
+            dominating_solutions[i].append(i + 1 + j)
+            dominated_counts[i + 1 + j] += 1
+        for j in np.flatnonzero(worse & ~better).tolist():
+            dominating_solutions[i + 1 + j].append(i)
+            dominated_counts[i] += 1
         
         if dominated_counts[i] == 0:
             fronts[0].append(i)
 
+    return _peel_fronts(fronts[0], dominated_counts, dominating_solutions)
+
+# Deb's front peeling: removing a front releases the genomes it dominated, the ones left undominated form the next front
+def _peel_fronts(first_front: List[int], dominated_counts: List[int], dominating_solutions: List[List[int]]) -> List[List[int]]:
+    fronts = [first_front]
     i = 0
     while i < len(fronts):
         next_front = []
@@ -62,74 +93,385 @@ def non_dominated_sort(population: Population, fitness_funcs: List[FitnessFunc])
             fronts.append(next_front)
         i += 1
     
-    return fronts
+    return [sorted(front) for front in fronts]
+
+# Groups row indices by front number, keeping the indices of a front in ascending order
+def _fronts_from_ranks(ranks: np.ndarray) -> List[List[int]]:
+    if len(ranks) == 0:
+        return [[]]
+    order = np.argsort(ranks, kind='stable')
+    return [front.tolist() for front in np.split(order, np.cumsum(np.bincount(ranks))[:-1])]
+
+# Two objectives in O(N log N). In order of decreasing first objective, a front's last member has its largest second objective,
+# and those tail values decrease from front to front, so a binary search finds the first front whose tail doesn't dominate the genome.
+def sweep_non_dominated_sort(objectives: Objectives) -> List[List[int]]:
+    if len(objectives) == 0:
+        return [[]]
+    points, inverse = np.unique(objectives[:, :2], axis=0, return_inverse=True) # Equal genomes share a front
+    ranks = np.empty(len(points), dtype=np.int64)
+    negated_tails = []
 
+    for u in range(len(points) - 1, -1, -1): # First objective descending, ties by second objective descending
+        second = -points[u, 1]
+        k = bisect_right(negated_tails, second)
+        if k == len(negated_tails):
+            negated_tails.append(second)
+        else:
+            negated_tails[k] = second
+        ranks[u] = k
+    return _fronts_from_ranks(ranks[inverse.reshape(-1)])
 
-def crowding_distance(population: Population, fitness_funcs: List[FitnessFunc], front: List[int]) -> Dict[int, float]:
-    distances = {i: 0.0 for i in front}
+# Efficient Non-dominated Sort with binary search (ENS-BS) for any number of objectives.
+# Genomes are visited in decreasing lexicographic order, so nothing visited later can dominate an earlier one:
+# each genome goes to the first front with no member dominating it, found by binary search over the fronts.
+def ens_non_dominated_sort(objectives: Objectives) -> List[List[int]]:
+    if len(objectives) == 0:
+        return [[]]
+    points, inverse = np.unique(objectives, axis=0, return_inverse=True)
+    ranks = np.empty(len(points), dtype=np.int64)
+    members, sizes = [], [] # Per front: a growing buffer of its points and how much of it is used
+
+    def dominated_by_front(k: int, point: np.ndarray) -> bool:
+        # Points are distinct, so >= everywhere already means dominance
+        return bool((members[k][:sizes[k]] >= point).all(axis=1).any())
+
+    for u in range(len(points) - 1, -1, -1):
+        point = points[u]
+        low, high = 0, len(members)
+        while low < high:
+            middle = (low + high) // 2
+            if dominated_by_front(middle, point):
+                low = middle + 1
+            else:
+                high = middle
 
-    for i in range(len(fitness_funcs)):
-        sorted_front = sorted(front, key = lambda j: fitness_funcs[i](population[j]))
-        distances[sorted_front[0]] = INFINITE
-        distances[sorted_front[-1]] = INFINITE
+        if low == len(members):
+            members.append(np.empty((16, points.shape[1])))
+            sizes.append(0)
+        elif sizes[low] == len(members[low]):
+            members[low] = np.concatenate([members[low], np.empty_like(members[low])])
+        members[low][sizes[low]] = point
+        sizes[low] += 1
+        ranks[u] = low
+    return _fronts_from_ranks(ranks[inverse.reshape(-1)])
 
-        if len(sorted_front) > 2:
-            min_fitness = fitness_funcs[i](population[sorted_front[0]])
-            max_fitness = fitness_funcs[i](population[sorted_front[-1]])
+# Compares rows start..stop with every later row and returns the dominance pairs found as (dominators, dominated) index arrays
+def _dominance_block(objectives: Objectives, start: int, stop: int) -> Tuple[np.ndarray, np.ndarray]:
+    dominators, dominated = [], []
+    for i in range(start, stop):
+        better = (objectives[i] > objectives[i+1:]).any(axis=1)
+        worse = (objectives[i] < objectives[i+1:]).any(axis=1)
 
-            if max_fitness == min_fitness:
-                continue
+        losers = i + 1 + np.flatnonzero(better & ~worse)
+        winners = i + 1 + np.flatnonzero(worse & ~better)
+        dominators += [np.full(len(losers), i), winners]
+        dominated += [losers, np.full(len(winners), i)]
+    return np.concatenate(dominators + [np.empty(0, dtype=np.int64)]), np.concatenate(dominated + [np.empty(0, dtype=np.int64)])
 
-            for k in range(1, len(sorted_front) - 1):
-                next_neighbour = fitness_funcs[i](population[sorted_front[k+1]])
-                prev_neighbour = fitness_funcs[i](population[sorted_front[k-1]])
+# Deb's sort with the O(M*N^2) pair comparisons split into row blocks on an executor. The blocks' dominance pairs are
+# reduced into domination counts and dominated lists, then peeled into fronts as usual.
+# Pays off for large populations with three or more objectives when several cores are available.
+def parallel_non_dominated_sort(objectives: Objectives, executor: Executor, block_size: int = 256) -> List[List[int]]:
+    population_size = len(objectives)
+    if population_size == 0:
+        return [[]]
 
-                next_prev_neighbour_diff = next_neighbour - prev_neighbour
-                max_min_diff = max_fitness - min_fitness
+    # Later rows have fewer partners, so blocks get smaller towards the start to even out the work
+    bounds = np.unique(np.round(population_size * (1 - np.sqrt(np.linspace(1, 0, max(population_size // block_size, 1) + 1)))).astype(int))
+    starts, stops = bounds[:-1].tolist(), bounds[1:].tolist()
 
-                distances[sorted_front[k]] += next_prev_neighbour_diff / max_min_diff
+    blocks = list(executor.map(_dominance_block, [objectives] * len(starts), starts, stops))
+    dominators = np.concatenate([block[0] for block in blocks])
+    dominated = np.concatenate([block[1] for block in blocks])
+
+    dominated_counts = np.bincount(dominated, minlength=population_size).tolist()
+    order = np.argsort(dominators, kind='stable')
+    splits = np.cumsum(np.bincount(dominators, minlength=population_size))[:-1]
+    dominating_solutions = [solutions.tolist() for solutions in np.split(dominated[order], splits)]
+
+    first_front = [i for i, count in enumerate(dominated_counts) if count == 0]
+    return _peel_fronts(first_front, dominated_counts, dominating_solutions)
+
+NON_DOMINATED_SORTS = {
+    'naive': naive_non_dominated_sort,
+    'sweep': sweep_non_dominated_sort,
+    'ens': ens_non_dominated_sort,
+}
+
+def non_dominated_sort(population: Population, fitness_funcs: List[FitnessFunc], objectives: Optional[Objectives] = None, method: str = 'auto',
+                       executor: Optional[Executor] = None) -> List[List[int]]:
+    if objectives is None:
+        objectives = evaluate_objectives(population, fitness_funcs)
+
+    if method == 'parallel':
+        if executor is None:
+            raise ValueError("The parallel non-dominated sort needs an executor.")
+        return parallel_non_dominated_sort(objectives, executor)
+
+    # 'auto' picks the sweep for one or two objectives and ENS-BS above that
+    if method == 'auto':
+        method = 'sweep' if objectives.shape[1] <= 2 else 'ens'
+    if method not in NON_DOMINATED_SORTS:
+        raise ValueError(f"Unknown non-dominated sort: {method}")
+
+    if objectives.shape[1] == 1 and method == 'sweep':
+        objectives = np.hstack([objectives, objectives])
+    return NON_DOMINATED_SORTS[method](objectives)
+
+
+# --- CROWDING DISTANCE ---
+
+# Crowding distances of one front from its (len(front), M) objective rows, in the same order as the rows.
+# Each objective column is sorted once with argsort and every interior genome gets its neighbours' normalised gap in one step.
+def crowding_distance_array(front_objectives: Objectives) -> np.ndarray:
+    size, objective_count = front_objectives.shape
+    distances = np.zeros(size)
+    if size == 0:
+        return distances
+
+    for i in range(objective_count):
+        order = np.argsort(front_objectives[:, i], kind='stable')
+        column = front_objectives[order, i]
+        distances[order[0]] = distances[order[-1]] = INFINITE
+
+        if size > 2 and column[-1] != column[0]:
+            distances[order[1:-1]] += (column[2:] - column[:-2]) / (column[-1] - column[0])
     return distances
 
+def crowding_distance(population: Population, fitness_funcs: List[FitnessFunc], front: List[int], objectives: Optional[Objectives] = None) -> Dict[int, float]:
+    if objectives is None:
+        objectives = evaluate_objectives(population, fitness_funcs)
+    return dict(zip(front, crowding_distance_array(objectives[front]).tolist()))
+
+# The 'count' most spread out genomes of a front (largest crowding distance), picked with argpartition instead of a full sort
+def crowded_truncation(front: List[int], front_objectives: Objectives, count: int) -> List[int]:
+    if count >= len(front):
+        return list(front)
+    if count <= 0:
+        return []
+    distances = crowding_distance_array(front_objectives)
+    chosen = np.argpartition(-distances, count - 1)[:count]
+    return np.asarray(front)[chosen].tolist()
+
+# --- PARETO ARCHIVE ---
+
+class ParetoArchive:
+    """
+    External archive of the non-dominated genomes seen during a run, bounded to 'capacity' genomes.
+
+    With two objectives the archive is a list sorted by decreasing first objective (so increasing second objective):
+    a binary search tells whether a new genome is dominated and finds the contiguous run of genomes it dominates.
+    With more objectives dominance is checked against the whole archive with one array comparison. Those objectives live in a
+    preallocated buffer that grows geometrically; removed rows are only masked out and compacted once they make up half of it.
+    When the archive overflows, the genome with the smallest crowding distance is dropped (the extremes are always kept).
+    """
+    def __init__(self, objective_count: int, capacity: int = 100):
+        self.objective_count = objective_count
+        self.capacity = capacity
+        self._genomes = [] # In archive order with two objectives, per buffer slot (None once removed) otherwise
+        self._rows = [] # Objective vectors as tuples, in archive order (two objectives)
+        self._negated_first, self._second = [], [] # Search keys of the two objective list
+        self._buffer = np.empty((16, objective_count)) # Objective rows per slot (more objectives)
+        self._alive = np.zeros(16, dtype=bool)
+        self._used = 0 # Slots handed out so far
+        self._count = 0 # Slots still alive
+
+    def __len__(self) -> int:
+        return len(self._genomes) if self.objective_count == 2 else self._count
+
+    def _live_slots(self) -> np.ndarray:
+        return np.flatnonzero(self._alive[:self._used])
+
+    @property
+    def genomes(self) -> Population:
+        if self.objective_count == 2:
+            return list(self._genomes)
+        return [self._genomes[i] for i in self._live_slots()]
+
+    @property
+    def objectives(self) -> Objectives:
+        if self.objective_count == 2:
+            return np.array(self._rows, dtype=float).reshape(len(self._rows), 2)
+        return self._buffer[self._live_slots()]
+
+    # Adds a copy of the genome unless an archived genome dominates or equals it. Returns whether it was added.
+    def add(self, genome: Genome, objectives) -> bool:
+        point = tuple(float(value) for value in objectives)
+        if self.objective_count == 2:
+            added = self._add_sorted(genome, point)
+        else:
+            added = self._add_any(genome, point)
+
+        if added and len(self) > self.capacity:
+            self._drop_most_crowded()
+        return added
+
+    def update(self, population: Population, objectives: Objectives) -> int:
+        # Only the batch's own first front can enter the archive
+        first_front = non_dominated_sort(population, [], objectives)[0]
+        return sum(self.add(population[i], objectives[i]) for i in first_front)
+
+    def _add_sorted(self, genome: Genome, point: tuple) -> bool:
+        first, second = point
+
+        # Genomes before 'end' have a first objective >= first, the last of them has the largest second objective
+        end = bisect_right(self._negated_first, -first)
+        if end > 0 and self._second[end - 1] >= second:
+            return False # Dominated or equal
+
+        # From 'start' on the first objective is <= first, and the ones with second objective <= second are dominated
+        start = bisect_left(self._negated_first, -first)
+        stop = bisect_right(self._second, second, lo=start)
+        self._rows[start:stop] = [point]
+        self._genomes[start:stop] = [copy_genome(genome)]
+        self._negated_first[start:stop] = [-first]
+        self._second[start:stop] = [second]
+        return True
+
+    def _add_any(self, genome: Genome, point: tuple) -> bool:
+        new = np.array(point)
+        archived, alive = self._buffer[:self._used], self._alive[:self._used]
+        if (alive & (archived >= new).all(axis=1)).any():
+            return False # Dominated or equal
+        for i in np.flatnonzero(alive & (new >= archived).all(axis=1)):
+            self._remove_slot(i)
+
+        if self._used == len(self._buffer):
+            self._make_room()
+        self._buffer[self._used] = new
+        self._alive[self._used] = True
+        self._genomes.append(copy_genome(genome))
+        self._used += 1
+        self._count += 1
+        return True
+
+    def _remove_slot(self, i: int) -> None:
+        self._alive[i] = False
+        self._genomes[i] = None
+        self._count -= 1
+
+    # Compacts the live rows when at least half the slots are dead, doubles the buffer otherwise
+    def _make_room(self) -> None:
+        if 2 * self._count <= self._used:
+            live = self._live_slots()
+            self._buffer[:len(live)] = self._buffer[live]
+            self._genomes = [self._genomes[i] for i in live]
+            self._alive[:] = False
+            self._alive[:len(live)] = True
+            self._used = len(live)
+        else:
+            self._buffer = np.concatenate([self._buffer, np.empty_like(self._buffer)])
+            self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+
+    def _drop_most_crowded(self) -> None:
+        if self.objective_count != 2:
+            live = self._live_slots()
+            self._remove_slot(live[int(np.argmin(crowding_distance_array(self._buffer[live])))])
+            return
+        i = int(np.argmin(crowding_distance_array(self.objectives)))
+        del self._rows[i]
+        del self._genomes[i]
+        del self._negated_first[i]
+        del self._second[i]
+
+
 def run_nsga2(
         populate_func: PopulateFunc,
         fitness_funcs: List[FitnessFunc],
         selection_func: SelectionFunc,
         crossover_func: CrossoverFunc,
         mutation_func: MutationFunc,
-        generation_limit: int = 100
+        generation_limit: int = 100,
+        archive: Optional[ParetoArchive] = None,
+        monitor: Optional[Callable[[int, Objectives], bool]] = None,
+        executor: Optional[Executor] = None,
+        sort_method: str = 'auto',
+        chunk_size: int = 64,
+        delta_fitness_funcs: Optional[List[Optional[DeltaFitnessFunc]]] = None
 ) -> Population :
     
+    # With an executor the objectives are evaluated in chunks across its workers,
+    # and sort_method='parallel' also splits the dominance comparisons of the combined population
+    def evaluate(genomes: Population, funcs: List[FitnessFunc] = fitness_funcs) -> Objectives:
+        if executor is None:
+            return evaluate_objectives(genomes, funcs)
+        return evaluate_objectives_parallel(genomes, funcs, executor, chunk_size)
+
+    # With delta_fitness_funcs (one per objective, None where there is none) operators report their changes (see Data_Structure.Change)
+    # and those objectives of a child are computed from its parent's cached row, as in Evolution.run_evolution; the rest are evaluated
+    def evaluate_offspring(offspring: Population, parents: Population, changes: list, parent_rows: Objectives) -> Objectives:
+        offspring_objectives = np.empty((len(offspring), len(fitness_funcs)))
+        evaluated = [m for m, delta in enumerate(delta_fitness_funcs) if delta is None]
+        if evaluated:
+            offspring_objectives[:, evaluated] = evaluate(offspring, [fitness_funcs[m] for m in evaluated])
+        for m, delta in enumerate(delta_fitness_funcs):
+            if delta is not None:
+                offspring_objectives[:, m] = [delta(child, parent_rows[k, m], change, parent=parent)
+                                              for k, (child, parent, change) in enumerate(zip(offspring, parents, changes))]
+        return offspring_objectives
+
     population = populate_func()
+    objectives = evaluate(population)
+    if archive is not None:
+        archive.update(population, objectives)
 
     for generation in range(generation_limit):
-        parent_fronts = non_dominated_sort(population, fitness_funcs)
+        parent_fronts = non_dominated_sort(population, fitness_funcs, objectives, sort_method, executor)
+
+        # Per-generation indicators of the first front (see NSGA_Indicators.ConvergenceMonitor); True stops the run
+        if monitor is not None and monitor(generation, objectives[parent_fronts[0]]):
+            break
         parent_crowding_distances = {}
         for front in parent_fronts:
-            parent_crowding_distances.update(crowding_distance(population, fitness_funcs, front))
+            parent_crowding_distances.update(zip(front, crowding_distance_array(objectives[front]).tolist()))
 
-        offspring_population = []
+        offspring_population, offspring_parents, offspring_changes = [], [], []
         for _ in range(len(population) // 2):
             parents = selection_func(population, fitness_funcs, parent_fronts, parent_crowding_distances)
-            offspring_a, offspring_b = crossover_func(parents[0], parents[1])
-            offspring_a, offspring_b = mutation_func(offspring_a), mutation_func(offspring_b)
+            if delta_fitness_funcs is not None:
+                offspring_a, offspring_b, change_a, change_b = crossover_func(parents[0], parents[1], report_changes=True)
+            else:
+                offspring_a, offspring_b = crossover_func(parents[0], parents[1])
+
+            # Don't let the mutation change a parent in place, its cached objectives would go stale
+            if offspring_a is parents[0] or offspring_a is parents[1]:
+                offspring_a = copy_genome(offspring_a)
+            if offspring_b is parents[0] or offspring_b is parents[1]:
+                offspring_b = copy_genome(offspring_b)
+            if delta_fitness_funcs is not None:
+                offspring_a, mutation_change_a = mutation_func(offspring_a, report_changes=True)
+                offspring_b, mutation_change_b = mutation_func(offspring_b, report_changes=True)
+                offspring_parents += [parents[0], parents[1]]
+                offspring_changes += [merge_changes(change_a, mutation_change_a), merge_changes(change_b, mutation_change_b)]
+            else:
+                offspring_a, offspring_b = mutation_func(offspring_a), mutation_func(offspring_b)
             offspring_population += [offspring_a, offspring_b]
 
+        # Only the offspring are new; the parents' objective rows carry over
         combined_population = population + offspring_population
-        fronts = non_dominated_sort(combined_population, fitness_funcs)
+        if delta_fitness_funcs is not None:
+            row_of = {id(genome): i for i, genome in enumerate(population)} # Selection hands back population members
+            parent_rows = objectives[[row_of[id(parent)] for parent in offspring_parents]]
+            offspring_objectives = evaluate_offspring(offspring_population, offspring_parents, offspring_changes, parent_rows)
+        else:
+            offspring_objectives = evaluate(offspring_population)
+        combined_objectives = np.vstack([objectives, offspring_objectives])
+        if archive is not None:
+            archive.update(offspring_population, offspring_objectives)
+        fronts = non_dominated_sort(combined_population, fitness_funcs, combined_objectives, sort_method, executor)
 
-        next_generation = []
+        survivors = []
         for front in fronts:
-            if len(next_generation) + len(front) <= len(population):
-                next_generation.extend([combined_population[i] for i in front])
+            if len(survivors) + len(front) <= len(population):
+                survivors.extend(front)
             else:
-                distances = crowding_distance(combined_population, fitness_funcs, front)
-                sorted_front = sorted(front, key=lambda i: distances[i], reverse=True)
-                remaining_space = len(population) - len(next_generation)
-                next_generation.extend([combined_population[i] for i in sorted_front[:remaining_space]])
+                remaining_space = len(population) - len(survivors)
+                survivors.extend(crowded_truncation(front, combined_objectives[front], remaining_space))
                 break
         
-        population = next_generation
+        population = [combined_population[i] for i in survivors]
+        objectives = combined_objectives[survivors]
 
     # Final non-dominated sort to return the best solutions
-    final_fronts = non_dominated_sort(population, fitness_funcs)
+    final_fronts = non_dominated_sort(population, fitness_funcs, objectives)
     return [population[i] for i in final_fronts[0]], generation
\ No newline at end of file
@@ -0,0 +1,182 @@
+from bisect import bisect_left, bisect_right
+from collections import namedtuple
+import time
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from NSGA import Objectives, non_dominated_sort
+
+
+# --- QUALITY INDICATORS ---
+# Fronts are objective matrices (one row per genome) and every objective is maximised, like in NSGA.py.
+# The hypervolume reference point must be worse than the front in every objective (e.g. the nadir minus a margin).
+
+def _first_front(points: np.ndarray) -> np.ndarray:
+    if len(points) == 0:
+        return points
+    return np.unique(points[non_dominated_sort([], [], points)[0]], axis=0)
+
+# Internally everything is minimised with the reference point at the origin, so boxes are [0, -point]
+def _to_minimisation(front: Objectives, reference: np.ndarray) -> np.ndarray:
+    front = np.asarray(front, dtype=float).reshape(-1, len(reference))
+    front = front[(front > reference).all(axis=1)] # Points not better than the reference add nothing
+    return reference - _first_front(front)
+
+
+def _hypervolume_2d(points: np.ndarray) -> float:
+    # Ascending first coordinate: on a non-dominated front the second one descends, every point adds one rectangle up to the origin
+    points = points[np.argsort(points[:, 0])]
+    widths = np.diff(np.concatenate([points[:, 0], [0.0]]))
+    return float((widths * -points[:, 1]).sum())
+
+def _hypervolume_3d(points: np.ndarray) -> float:
+    """
+    Sweeps the points by their third coordinate and keeps the 2-D staircase of the points seen so far as sorted lists,
+    so each insertion updates the staircase area from the few steps it touches: O(n log n) searches in total.
+    """
+    points = points[np.argsort(points[:, 2])]
+    xs, ys = [], [] # Staircase: xs ascending, ys descending
+    area = volume = 0.0
+
+    def term(i: int) -> float:
+        next_x = xs[i + 1] if i + 1 < len(xs) else 0.0
+        return (next_x - xs[i]) * -ys[i]
+
+    for k, (x, y, z) in enumerate(points.tolist()):
+        if k > 0:
+            volume += area * (z - points[k - 1, 2])
+
+        position = bisect_right(xs, x)
+        if position > 0 and ys[position - 1] <= y:
+            continue # Dominated in the first two coordinates, the staircase doesn't change
+
+        # Steps from 'start' with y >= the new y are covered by the new point (ys descend, so they are contiguous)
+        start = bisect_left(xs, x)
+        stop = start
+        while stop < len(xs) and ys[stop] >= y:
+            stop += 1
+
+        touched = range(max(start - 1, 0), stop)
+        area -= sum(term(i) for i in touched)
+        xs[start:stop] = [x]
+        ys[start:stop] = [y]
+        area += sum(term(i) for i in range(max(start - 1, 0), start + 1))
+
+    return volume + area * (0.0 - points[-1, 2])
+
+def _hypervolume_wfg(points: np.ndarray) -> float:
+    # While, Bradstreet and Barone's WFG: the sum of every point's exclusive volume against the points after it
+    if len(points) == 0:
+        return 0.0
+    if points.shape[1] == 2:
+        return _hypervolume_2d(points)
+
+    points = points[np.argsort(-points[:, -1])] # Worst last objective first keeps the limit sets small
+    total = 0.0
+    for k in range(len(points)):
+        box = float(np.prod(-points[k]))
+        limited = np.maximum(points[k + 1:], points[k]) # The later points clipped to what point k covers
+        if len(limited):
+            limited = -_first_front(-limited)
+        total += box - _hypervolume_wfg(limited)
+    return total
+
+def hypervolume(front: Objectives, reference_point) -> float:
+    reference = np.asarray(reference_point, dtype=float)
+    points = _to_minimisation(front, reference)
+    if len(points) == 0:
+        return 0.0
+
+    # Exact in every case: a sweep for 1 to 3 objectives, WFG above
+    if points.shape[1] == 1:
+        return float(-points.min())
+    if points.shape[1] == 2:
+        return _hypervolume_2d(points)
+    if points.shape[1] == 3:
+        return _hypervolume_3d(points)
+    return _hypervolume_wfg(points)
+
+
+# Distance from every row of 'points' to its nearest row of 'others', in blocks so the distance matrix stays small
+def _nearest_distances(points: np.ndarray, others: np.ndarray, exclude_self: bool = False, block: int = 1024) -> np.ndarray:
+    nearest = np.empty(len(points))
+    for start in range(0, len(points), block):
+        distances = np.sqrt(((points[start:start + block, None, :] - others[None, :, :]) ** 2).sum(axis=2))
+        if exclude_self:
+            distances[np.arange(len(distances)), np.arange(start, start + len(distances))] = np.inf
+        nearest[start:start + block] = distances.min(axis=1)
+    return nearest
+
+# Inverted generational distance: mean distance from each reference front point to the closest found point (lower is better)
+def igd(front: Objectives, reference_front: Objectives) -> float:
+    front = np.asarray(front, dtype=float)
+    reference_front = np.asarray(reference_front, dtype=float)
+    if len(front) == 0:
+        return np.inf
+    return float(_nearest_distances(reference_front, front).mean())
+
+def spread(front: Objectives, reference_front: Optional[Objectives] = None) -> float:
+    """
+    Generalised spread (Delta): 0 for evenly spaced points that reach the extremes of the reference front, larger is worse.
+    Uses nearest neighbour distances, so it works for any number of objectives. Without a reference front only the spacing counts.
+    """
+    front = np.unique(np.asarray(front, dtype=float), axis=0)
+    if len(front) < 2:
+        return 0.0
+
+    neighbour = _nearest_distances(front, front, exclude_self=True)
+    mean = neighbour.mean()
+    extremes = 0.0
+    if reference_front is not None:
+        reference_front = np.asarray(reference_front, dtype=float)
+        extreme_points = reference_front[np.argmax(reference_front, axis=0)] # Best reference point per objective
+        extremes = _nearest_distances(extreme_points, front).sum()
+
+    denominator = extremes + len(front) * mean
+    return float((extremes + np.abs(neighbour - mean).sum()) / denominator) if denominator > 0 else 0.0
+
+
+# --- CONVERGENCE MONITOR ---
+
+NSGAGenerationStats = namedtuple('NSGAGenerationStats', ['generation', 'seconds', 'front_size', 'hypervolume', 'igd', 'spread'])
+
+class ConvergenceMonitor:
+    """
+    Per-generation quality indicators for run_nsga2(monitor=...): hypervolume of the first front, plus IGD and spread
+    when a reference front is known. Every row is kept in 'history' and passed to 'stream' (e.g. print or a CSV writer).
+
+    With 'patience' set, the run stops once the hypervolume hasn't grown by more than 'tolerance' (relative) for that many generations.
+    """
+    def __init__(self, reference_point, reference_front: Optional[Objectives] = None, patience: Optional[int] = None,
+                 tolerance: float = 1e-6, stream: Optional[Callable[[NSGAGenerationStats], None]] = None):
+        self.reference_point = np.asarray(reference_point, dtype=float)
+        self.reference_front = None if reference_front is None else np.asarray(reference_front, dtype=float)
+        self.patience = patience
+        self.tolerance = tolerance
+        self.stream = stream
+        self.history: List[NSGAGenerationStats] = []
+        self.start_time = time.perf_counter()
+        self._best_hypervolume = -np.inf
+        self._stagnant = 0
+
+    def __call__(self, generation: int, front_objectives: Objectives) -> bool:
+        value = hypervolume(front_objectives, self.reference_point)
+        stats = NSGAGenerationStats(
+            generation=generation,
+            seconds=time.perf_counter() - self.start_time,
+            front_size=len(front_objectives),
+            hypervolume=value,
+            igd=igd(front_objectives, self.reference_front) if self.reference_front is not None else None,
+            spread=spread(front_objectives, self.reference_front)
+        )
+        self.history.append(stats)
+        if self.stream is not None:
+            self.stream(stats)
+
+        if value > self._best_hypervolume * (1 + self.tolerance) + 1e-12:
+            self._best_hypervolume = value
+            self._stagnant = 0
+        else:
+            self._stagnant += 1
+        return self.patience is not None and self._stagnant >= self.patience # True stops the run
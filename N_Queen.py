@@ -1,44 +1,58 @@
 from functools import partial
 
 from typing import Tuple
-from Evolution import Genome, run_evolution
-from Population import generate_2d_population, generate_nqueen_board
-from Selection import roulette_wheel_selection, rank_selection
-from Crossover import single_point_crossover, uniform_crossover_2d
-from Mutation import bit_flip_mutation_2d,swap_mutation_2d
+
+import numpy as np
+
+from Evolution import Genome, ArrayPopulation, run_evolution, run_array_evolution
+from Population import generate_2d_population, generate_nqueen_board, generate_nqueen_board_array
+from Selection import roulette_wheel_selection, rank_selection, roulette_wheel_selection_array
+from Crossover import single_point_crossover, uniform_crossover_2d, uniform_crossover_array
+from Mutation import bit_flip_mutation_2d,swap_mutation_2d, swap_mutation_array
 
 def fitness(genome: Genome) -> int:
     N = len(genome)
     score = (N * (N - 1)) // 2  
-    queens = []
-
-    for i in range(len(genome)):
-        for j in range(len(genome[i])):
-            if genome[i][j] == 1:
-                queens.append((i, j))
+    rows, cols = np.nonzero(np.asarray(genome))
 
     # Ensure there are exactly N queens for a valid calculation
-    if len(queens) != N:
+    if len(rows) != N:
         return 0 # Or handle as an invalid genome
 
+    # Two distinct queens share at most one line, so counting queens per line gives the clashing pairs without the pairwise loop
     clashes = 0
-    # Iterate through all unique pairs of queens
-    for i in range(len(queens)):
-        for j in range(i + 1, len(queens)):
-            q1 = queens[i]
-            q2 = queens[j]
-
-            check_row = q1[0] == q2[0]
-            check_col = q1[1] == q2[1]
-            check_dia = abs(q1[0] - q2[0]) == abs(q1[1] - q2[1])
-
-            # Check for attacks
-            if check_row or check_col or check_dia:
-                clashes += 1
+    for lines, count in ((rows, N), (cols, N), (rows - cols + N - 1, 2 * N - 1), (rows + cols, 2 * N - 1)):
+        counts = np.bincount(lines, minlength=count)
+        clashes += int((counts * (counts - 1) // 2).sum())
     
     return score - clashes
 
 
+# Same score as fitness, for a whole (size, N, N) population at once.
+# Two queens clash when they share a line (row, column, diagonal or anti-diagonal), so a line holding c queens adds c*(c-1)/2 clashes.
+def fitness_array(population: ArrayPopulation) -> np.ndarray:
+    size, N = len(population), population.shape[1]
+    rows, cols = np.indices((N, N))
+
+    # One-hot map from each cell to its diagonal and anti-diagonal, so the counts are one matrix product
+    diagonals = np.zeros((N * N, 2 * N - 1), dtype=np.int64)
+    diagonals[np.arange(N * N), (rows - cols + N - 1).ravel()] = 1
+    anti_diagonals = np.zeros((N * N, 2 * N - 1), dtype=np.int64)
+    anti_diagonals[np.arange(N * N), (rows + cols).ravel()] = 1
+
+    boards = population.reshape(size, -1).astype(np.int64)
+    counts = np.concatenate([
+        population.sum(axis=2),
+        population.sum(axis=1),
+        boards @ diagonals,
+        boards @ anti_diagonals
+    ], axis=1)
+    clashes = (counts * (counts - 1) // 2).sum(axis=1)
+
+    score = (N * (N - 1)) // 2 - clashes
+    return np.where(boards.sum(axis=1) == N, score, 0) # Boards without exactly N queens are invalid
+
+
 
 if __name__ == "__main__":
 
@@ -55,12 +69,22 @@ if __name__ == "__main__":
 
     # print(fitness(final_board))
 
-    population, generation = run_evolution(
-        populate_func= partial(generate_nqueen_board, size= 100, rows= 8, cols= 8),
-        selection_func= roulette_wheel_selection,
-        crossover_func= uniform_crossover_2d,
-        mutation_func= partial(swap_mutation_2d, num= 20, probability= 0.7),
-        fitness_func= fitness,
+    # population, generation = run_evolution(
+    #     populate_func= partial(generate_nqueen_board, size= 100, rows= 8, cols= 8),
+    #     selection_func= roulette_wheel_selection,
+    #     crossover_func= uniform_crossover_2d,
+    #     mutation_func= partial(swap_mutation_2d, num= 20, probability= 0.7),
+    #     fitness_func= fitness,
+    #     fitness_limit= 28,
+    #     generation_limit= 1000
+    # )
+
+    population, generation = run_array_evolution(
+        populate_func= partial(generate_nqueen_board_array, size= 100, rows= 8, cols= 8),
+        selection_func= roulette_wheel_selection_array,
+        crossover_func= uniform_crossover_array,
+        mutation_func= partial(swap_mutation_array, num= 20, probability= 0.7),
+        fitness_func= fitness_array,
         fitness_limit= 28,
         generation_limit= 1000
     )
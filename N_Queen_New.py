@@ -1,22 +1,175 @@
+from collections import OrderedDict
+from copy import copy
 from functools import partial
+from random import randrange
+from time import perf_counter
+from typing import Optional, Tuple
 
-from Evolution import Genome, run_evolution
-from Population import generate_listed_population, generate_listed_permutation_population
-from Selection import roulette_wheel_selection, tournament_selection
-from Crossover import single_point_crossover, multi_point_crossover, davis_order_crossover, uniform_crossover
-from Mutation import random_resetting, swap_mutation
+import numpy as np
+
+from Data_Structure import Change
+from Evolution import Genome, ArrayPopulation, run_evolution, run_array_evolution
+from Population import generate_listed_population, generate_listed_permutation_population, generate_permutation_population_array
+from Selection import roulette_wheel_selection, tournament_selection, tournament_selection_array
+from Crossover import single_point_crossover, multi_point_crossover, davis_order_crossover, uniform_crossover, order_crossover_array
+from Mutation import random_resetting, swap_mutation, swap_mutation_array
+
+# genome[i] is the row of the queen in column i.
+# Two queens clash when they share a row, a diagonal or an anti-diagonal, so a line holding c queens adds c*(c-1)/2 clashes.
+# Counting the queens per line costs O(n) instead of checking all O(n^2) pairs.
+def line_counts(genome: Genome) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    n = len(genome)
+    rows = np.asarray(genome, dtype=np.int64)
+    columns = np.arange(n)
+    return (
+        np.bincount(rows, minlength=n),
+        np.bincount(columns - rows + n - 1, minlength=2 * n - 1),
+        np.bincount(columns + rows, minlength=2 * n - 1)
+    )
 
 def fitness(genome: Genome) -> int:
     n = len(genome)
-    score = (n*(n-1)) // 2
+    clashes = sum(int((counts * (counts - 1) // 2).sum()) for counts in line_counts(genome))
+    return (n*(n-1)) // 2 - clashes
+
+
+class QueenCounters:
+    """
+    Row, diagonal and anti-diagonal occupancy of one board, kept up to date so a swap of two columns is scored and applied in O(1).
+    """
+    def __init__(self, genome: Genome):
+        self.genome = genome
+        self.n = len(genome)
+        self.rows, self.diagonals, self.anti_diagonals = (counts.tolist() for counts in line_counts(genome))
+        self.clashes = sum(c * (c - 1) // 2 for counts in (self.rows, self.diagonals, self.anti_diagonals) for c in counts)
+
+    @property
+    def fitness(self) -> int:
+        return (self.n*(self.n-1)) // 2 - self.clashes
+
+    def _lines(self, column: int, row: int) -> Tuple[int, int]:
+        return column - row + self.n - 1, column + row
+
+    # Queens in column i and j trade rows; rows keep their counts, only the four diagonals change
+    def swap_delta(self, i: int, j: int) -> int:
+        if i == j or self.genome[i] == self.genome[j]:
+            return 0
+        removed = [self._lines(i, self.genome[i]), self._lines(j, self.genome[j])]
+        added = [self._lines(i, self.genome[j]), self._lines(j, self.genome[i])]
+
+        # Work on the few touched counts only, so lines shared by two of the moves are handled exactly
+        counts = {}
+        for lines in removed + added:
+            counts.setdefault(('d', lines[0]), self.diagonals[lines[0]])
+            counts.setdefault(('a', lines[1]), self.anti_diagonals[lines[1]])
+        before = sum(c * (c - 1) // 2 for c in counts.values())
+        for diagonal, anti_diagonal in removed:
+            counts[('d', diagonal)] -= 1
+            counts[('a', anti_diagonal)] -= 1
+        for diagonal, anti_diagonal in added:
+            counts[('d', diagonal)] += 1
+            counts[('a', anti_diagonal)] += 1
+        return sum(c * (c - 1) // 2 for c in counts.values()) - before
+
+    # Applies the swap to the genome and the counters, returns the new fitness
+    def swap(self, i: int, j: int) -> int:
+        delta = self.swap_delta(i, j)
+        for column in (i, j):
+            diagonal, anti_diagonal = self._lines(column, self.genome[column])
+            self.diagonals[diagonal] -= 1
+            self.anti_diagonals[anti_diagonal] -= 1
+        self.genome[i], self.genome[j] = self.genome[j], self.genome[i]
+        for column in (i, j):
+            diagonal, anti_diagonal = self._lines(column, self.genome[column])
+            self.diagonals[diagonal] += 1
+            self.anti_diagonals[anti_diagonal] += 1
+        self.clashes += delta
+        return self.fitness
+
+    # Queen of 'column' goes from row 'old' to row 'new' (genome already holds 'new'), O(1)
+    def _shift(self, column: int, old: int, new: int) -> None:
+        for counts, line in ((self.rows, old), (self.diagonals, column - old + self.n - 1), (self.anti_diagonals, column + old)):
+            counts[line] -= 1
+            self.clashes -= counts[line]
+        for counts, line in ((self.rows, new), (self.diagonals, column - new + self.n - 1), (self.anti_diagonals, column + new)):
+            self.clashes += counts[line]
+            counts[line] += 1
+
+    # Counters of 'genome', which is self.genome with 'change' applied: one copy of the counts, then O(1) per changed column
+    def derive(self, genome: Genome, change: Change) -> 'QueenCounters':
+        counters = copy(self)
+        counters.genome = genome
+        counters.rows, counters.diagonals, counters.anti_diagonals = list(self.rows), list(self.diagonals), list(self.anti_diagonals)
+        for column, old, new in zip(change.indices, change.old_values, change.new_values):
+            counters._shift(column, old, new)
+        return counters
+
+    def in_clash(self, column: int) -> bool:
+        row = self.genome[column]
+        diagonal, anti_diagonal = self._lines(column, row)
+        return self.rows[row] > 1 or self.diagonals[diagonal] > 1 or self.anti_diagonals[anti_diagonal] > 1
 
-    for i in range(n):
-        for j in range(i+1, n):
-            if genome[i] == genome[j]:
-                score -= 1
-            if abs(i-j) == abs(genome[i]-genome[j]):
-                score -= 1
-    return score
+
+# Memetic step for permutation boards: swaps a clashing queen with a random column whenever that lowers the clashes.
+# Every try costs O(1) with the counters, so this scales to boards with tens of thousands of queens.
+def repair_clashes(genome: Genome, deadline: Optional[float] = None, tries: int = 50) -> Genome:
+    board = QueenCounters(genome)
+    improved = True
+    while improved and board.clashes > 0:
+        improved = False
+        for i in range(board.n):
+            if deadline is not None and i % 256 == 0 and perf_counter() > deadline:
+                return genome
+            if not board.in_clash(i):
+                continue
+            for _ in range(tries):
+                j = randrange(board.n)
+                if board.swap_delta(i, j) < 0:
+                    board.swap(i, j)
+                    improved = True
+                    break
+    return genome
+
+
+# Same score as fitness for a whole (size, n) permutation array population.
+# Every board's lines get their own block of counters, so one bincount per line type scores the population in O(size*n).
+def fitness_array(population: ArrayPopulation) -> np.ndarray:
+    size, n = population.shape
+    rows = population.astype(np.int64)
+    columns = np.arange(n)
+    boards = np.arange(size)[:, None]
+
+    clashes = np.zeros(size, dtype=np.int64)
+    for lines, count in ((rows, n), (columns - rows + n - 1, 2 * n - 1), (columns + rows, 2 * n - 1)):
+        counts = np.bincount((boards * count + lines).ravel(), minlength=size * count).reshape(size, count)
+        clashes += (counts * (counts - 1) // 2).sum(axis=1)
+    return (n*(n-1)) // 2 - clashes
+
+class QueenDeltaFitness:
+    """
+    Delta fitness for run_evolution that keeps the QueenCounters of the genomes it scored (least recently used dropped past 'capacity').
+    A child is scored from its parent's counters in O(1) per changed column instead of rescanning the board.
+    Genomes must only change through the changes the engine reports, which holds since the engine copies children before mutating them.
+    """
+    def __init__(self, capacity: int = 1024):
+        self.capacity = capacity
+        self._counters = OrderedDict() # id(genome) -> QueenCounters, which also keeps the genome (and so its id) alive
+
+    def _remember(self, counters: QueenCounters) -> QueenCounters:
+        self._counters[id(counters.genome)] = counters
+        self._counters.move_to_end(id(counters.genome))
+        if len(self._counters) > self.capacity:
+            self._counters.popitem(last=False)
+        return counters
+
+    def __call__(self, genome: Genome, parent_fitness: int, change: Change, parent: Optional[Genome] = None) -> int:
+        if parent is None or 2 * len(change.indices) > len(genome):
+            return self._remember(QueenCounters(genome)).fitness
+
+        parent_counters = self._counters.get(id(parent))
+        if parent_counters is None or parent_counters.genome is not parent or parent_counters.fitness != parent_fitness:
+            parent_counters = self._remember(QueenCounters(parent))
+        return self._remember(parent_counters.derive(genome, change)).fitness
 
 if __name__ == "__main__":
 
@@ -32,10 +185,30 @@ if __name__ == "__main__":
         mutation_func= swap_mutation,
         # mutation_func= partial(random_resetting, allowed_values= list(range(1, 8))),
         fitness_func= fitness,
+        delta_fitness_func= QueenDeltaFitness(),
         fitness_limit= 28,
         generation_limit= 2000
     )
 
     print(generation)
     print(fitness(population[0]))
-    print(population[0])
\ No newline at end of file
+    print(population[0])
+
+    # Large boards: one permutation array for the whole population, scored with the line counters
+    N = 1000
+    population, generation = run_array_evolution(
+        populate_func= partial(generate_permutation_population_array, size= 100, genome_length= N),
+        selection_func= tournament_selection_array,
+        crossover_func= order_crossover_array,
+        mutation_func= partial(swap_mutation_array, num= 5, probability= 0.7),
+        fitness_func= fitness_array,
+        fitness_limit= (N*(N-1)) // 2,
+        generation_limit= 500
+    )
+
+    print(generation)
+    print((N*(N-1)) // 2 - fitness(population[0]), "clashes left")
+
+    board = population[0].tolist()
+    repair_clashes(board)
+    print((N*(N-1)) // 2 - fitness(board), "clashes left after repair")
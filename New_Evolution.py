@@ -1,5 +1,7 @@
 from typing import Callable, List, Optional, Tuple, TypeVar
 
+from Evolution import GenerationStats, copy_genome
+
 
 # Genome == Chromosome
 # Genome = List[int]
@@ -15,8 +17,8 @@ PopulateFunc = Callable[[], Population]
 SelectionFunc = Callable[[Population, FitnessFunc], List[Genome]]
 CrossoverFunc = Callable[[Genome, Genome], Tuple[Genome, Genome]]
 MutationFunc = Callable[[Genome, int, float], Genome]
-DynamicCrossoverRate = Callable[[Genome, Genome, Population, FitnessFunc], float]
-DynamicMutationRate = Callable[[Genome, Population, FitnessFunc], float]
+DynamicCrossoverRate = Callable[[Genome, Genome, GenerationStats], float]
+DynamicMutationRate = Callable[[Genome, GenerationStats], float]
 
 
 def expansion_replacement(old_population: Population, offspring_population: Population, fitness_func: FitnessFunc) -> Population:
@@ -51,9 +53,13 @@ def run_evolution(
     population = populate_func() # Calls the partial function with no param as all params are already in it
 
     for generation in range(generation_limit):
-        population = sorted(population, key=lambda genome: fitness_func(genome), reverse=True)
+        # Scored once per generation, then shared by the sort, selection and the dynamic rates
+        fitnesses = [fitness_func(genome) for genome in population]
+        order = sorted(range(len(population)), key= lambda i: fitnesses[i], reverse=True)
+        population = [population[i] for i in order]
+        stats = GenerationStats(population, [fitnesses[i] for i in order], fitness_func)
 
-        if fitness_func(population[0]) >= fitness_limit:
+        if stats.max >= fitness_limit:
             break
         
         # Number of offspring pairs for Replacement Strategy
@@ -72,17 +78,23 @@ def run_evolution(
         # Offspring
         offspring_population = []
         for _ in range(num_offspring_pairs):
-            parents = selection_func(population, fitness_func)
+            parents = selection_func(population, stats.fitness)
 
             if dynamic_crossover_probability:
-                crossover_prob = dynamic_crossover_probability(parents[0], parents[1], population, fitness_func)
+                crossover_prob = dynamic_crossover_probability(parents[0], parents[1], stats)
                 offspring_a, offspring_b = crossover_func(parents[0], parents[1], crossover_prob)
             else:
                 offspring_a, offspring_b = crossover_func(parents[0], parents[1])
 
+            # Mutations work in place: a child that is still its parent gets its own copy, so cached fitnesses and elites stay valid
+            if offspring_a is parents[0] or offspring_a is parents[1]:
+                offspring_a = copy_genome(offspring_a)
+            if offspring_b is parents[0] or offspring_b is parents[1]:
+                offspring_b = copy_genome(offspring_b)
+
             if dynamic_mutation_probability:
-                mutation_prob_a = dynamic_mutation_probability(offspring_a, population, fitness_func)
-                mutation_prob_b = dynamic_mutation_probability(offspring_b, population, fitness_func)
+                mutation_prob_a = dynamic_mutation_probability(offspring_a, stats)
+                mutation_prob_b = dynamic_mutation_probability(offspring_b, stats)
                 offspring_a = mutation_func(offspring_a, probability=mutation_prob_a)
                 offspring_b = mutation_func(offspring_b, probability=mutation_prob_b)
             else:
@@ -1,7 +1,10 @@
 from random import choices, choice, randrange, sample
+from typing import Callable, Optional, Sequence
 
-from Evolution import Genome, Population
-from Data_Structure import ScheduledClass
+import numpy as np
+
+from Evolution import Genome, Population, ArrayPopulation, rng
+from Data_Structure import ScheduledClass, Bounds, KnapsackInstance, TimetableProblem
 
 # Creates a genome as a list of binary integers of length 'k'
 # def <func_name>(<param_name>: <param_type>) -> <return_type> :
@@ -84,6 +87,161 @@ def generate_nqueen_board(size: int, rows: int, cols: int) -> Population:
 
 
 
+# --- ARRAY POPULATIONS ---
+# A (size, genome_length) 0/1 array
+def generate_binary_population_array(size: int, genome_length: int) -> ArrayPopulation:
+    return rng.integers(2, size=(size, genome_length), dtype=np.int8)
+
+# Random indices into 'list' with the smallest dtype that holds them, then one fancy-indexing lookup
+def _listed_array(list: list, shape: tuple) -> np.ndarray:
+    values = np.asarray(list)
+    indices = rng.integers(len(values), size=shape, dtype=np.uint8 if len(values) <= 256 else np.int64)
+    return values[indices]
+
+# A (size, genome_length) array of values drawn from 'list'
+def generate_listed_population_array(size: int, list: list, genome_length: int) -> ArrayPopulation:
+    return _listed_array(list, (size, genome_length))
+
+# A (size, genome_length) array, every row genome_length distinct values of 'list' (argsort of a uniform matrix)
+def generate_listed_permutation_population_array(size: int, list: list, genome_length: int) -> ArrayPopulation:
+    order = np.argsort(rng.random((size, len(list))), axis=1)[:, :genome_length]
+    return np.asarray(list)[order]
+
+# One 3D array of shape (size, rows, cols) for a whole population of grids
+def generate_grid_population(size: int, rows: int, cols: int, list: Sequence = (0, 1)) -> ArrayPopulation:
+    return _listed_array(list, (size, rows, cols))
+
+def generate_nqueen_board_array(size: int, rows: int, cols: int) -> ArrayPopulation:
+    population = np.zeros((size, rows, cols), dtype=np.int8)
+    population[np.arange(size)[:, None], np.arange(rows), rng.integers(cols, size=(size, rows))] = 1 # One queen per row
+    return population
+
+# A (size, genome_length) integer array, every row a random permutation of 0..genome_length-1
+def generate_permutation_population_array(size: int, genome_length: int) -> ArrayPopulation:
+    return rng.permuted(np.tile(np.arange(genome_length), (size, 1)), axis=1)
+
+# Timetables as a (size, 2, classes) array of room and timeslot indices, see Data_Structure.TimetableProblem.
+# int16 indices take 4 bytes per class instead of a ScheduledClass tuple per class.
+def generate_timetable_population_array(size: int, classes: int, rooms: int, time_slots: int) -> ArrayPopulation:
+    population = np.empty((size, 2, classes), dtype=np.int16)
+    population[:, 0] = rng.integers(rooms, size=(size, classes))
+    population[:, 1] = rng.integers(time_slots, size=(size, classes))
+    return population
+
+# A (size, length) float array, every gene drawn uniformly inside its bounds
+def generate_real_population(size: int, bounds: Bounds) -> ArrayPopulation:
+    lower, upper = np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float)
+    return rng.uniform(lower, upper, size=(size, len(lower)))
+
+# --- DIVERSITY ---
+# Average over genes of the chance that two different genomes disagree at that gene (0: all clones, 1: never agree).
+# Real valued genomes use the standard deviation per gene relative to uniform sampling inside the bounds, so both read about 1 when spread out.
+def population_diversity(population, bounds: Optional[Bounds] = None) -> float:
+    population = np.asarray(population)
+    size = len(population)
+    if size < 2:
+        return 0.0
+    genes = population.reshape(size, -1)
+
+    if np.issubdtype(genes.dtype, np.floating):
+        lower, upper = (genes.min(axis=0), genes.max(axis=0)) if bounds is None else (np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float))
+        spread = np.maximum(upper - lower, 1e-12) / np.sqrt(12) # Standard deviation of a uniform gene
+        return float(np.mean(genes.std(axis=0) / spread))
+
+    _, codes = np.unique(genes, return_inverse=True) # Any gene values (letters, city ids) as 0..k-1
+    codes = codes.reshape(genes.shape)
+    cells = np.arange(genes.shape[1]) * (codes.max() + 1) + codes
+    counts = np.bincount(cells.ravel())
+    equal_pairs = (counts * (counts - 1)).sum() / genes.shape[1]
+    return float(1 - equal_pairs / (size * (size - 1)))
+
+# Wraps a populate function so the diversity of every population it creates is passed to 'stream'
+def reporting_diversity(populate_func: Callable[..., object], name: str, bounds: Optional[Bounds] = None, stream: Callable[[str], None] = print) -> Callable[..., object]:
+    def populate(*args, **kwargs):
+        population = populate_func(*args, **kwargs)
+        stream(f"{name}: {len(population)} genomes, diversity {population_diversity(population, bounds):.3f}")
+        return population
+    return populate
+
+
+# --- SPREAD OUT INITIALIZATION ---
+# Latin hypercube: every gene's range is cut into 'size' strata and each stratum is used by exactly one genome
+def generate_latin_hypercube_population(size: int, bounds: Bounds) -> ArrayPopulation:
+    lower, upper = np.asarray(bounds.lower, dtype=float), np.asarray(bounds.upper, dtype=float)
+    strata = rng.permuted(np.tile(np.arange(size), (len(lower), 1)), axis=1).T
+    return lower + (strata + rng.random((size, len(lower)))) / size * (upper - lower)
+
+# Binary counterpart: every gene is 1 in exactly half of the genomes (size odd: the middle one is a coin flip)
+def generate_balanced_binary_population_array(size: int, genome_length: int) -> ArrayPopulation:
+    columns = np.tile((np.arange(size) < size // 2).astype(np.int8), (genome_length, 1))
+    if size % 2:
+        columns[:, -1] = rng.integers(2, size=genome_length)
+    return np.ascontiguousarray(rng.permuted(columns, axis=1).T)
+
+# Opposition based: each genome x gets its opposite lower + upper - x (1 - x for binary genomes),
+# and the fitter half of genomes and opposites is kept. 'fitness_func' scores a whole array population.
+def opposition_based(populate_func: Callable[..., ArrayPopulation], fitness_func: Callable[[ArrayPopulation], np.ndarray], bounds: Optional[Bounds] = None) -> Callable[..., ArrayPopulation]:
+    def populate(*args, **kwargs):
+        population = populate_func(*args, **kwargs)
+        if bounds is None:
+            opposites = (1 - population).astype(population.dtype)
+        else:
+            opposites = np.asarray(bounds.lower, dtype=float) + np.asarray(bounds.upper, dtype=float) - population
+        candidates = np.concatenate([population, opposites])
+        fitness = fitness_func(candidates)
+        return candidates[np.argpartition(-fitness, len(population) - 1)[:len(population)]]
+    return populate
+
+
+# --- HEURISTIC SEEDING ---
+# Nearest neighbour tours from distinct random start cities, the rest of the population random (TSP.py list genomes).
+# Works with numpy distance matrices and TSP_Data.OnDemandDistances alike, one distance row per step.
+def generate_nearest_neighbour_population(size: int, distance_matrix, random_fraction: float = 0.5) -> Population:
+    n = len(distance_matrix)
+    greedy = min(size - int(random_fraction * size), n)
+    population = []
+    for start in rng.permutation(n)[:greedy]:
+        visited = np.zeros(n, dtype=bool)
+        tour = [int(start)]
+        visited[start] = True
+        for _ in range(n - 1):
+            row = np.where(visited, np.inf, np.asarray(distance_matrix[tour[-1]], dtype=float))
+            tour.append(int(row.argmin()))
+            visited[tour[-1]] = True
+        population.append(tour)
+    return population + [sample(range(n), n) for _ in range(size - len(population))]
+
+# Randomized greedy knapsack fills: items in order of value density scaled by lognormal noise, taken while they fit.
+# noise 0 gives the plain greedy fill in every genome, larger noise more diverse and less greedy fills.
+def generate_greedy_knapsack_population_array(size: int, instance: KnapsackInstance, noise: float = 0.3) -> ArrayPopulation:
+    density = instance.values / np.maximum(instance.weights, 1e-12)
+    order = np.argsort(-density * rng.lognormal(0.0, noise, size=(size, len(density))), axis=1)
+    carried = np.cumsum(instance.weights[order], axis=1)
+    population = np.zeros((size, len(density)), dtype=np.int8)
+    np.put_along_axis(population, order, carried <= instance.capacity, axis=1)
+    return population
+
+# Classes in random order, each put in a random (room, slot) that breaks no hard constraint given the classes already placed,
+# preferring slots outside the bad days. A class with no conflict free place goes to a random one. Same layout as generate_timetable_population_array.
+def generate_greedy_timetable_population_array(size: int, problem: TimetableProblem) -> ArrayPopulation:
+    classes, room_count, slot_count = len(problem.class_course), len(problem.rooms), len(problem.time_slots)
+    population = np.empty((size, 2, classes), dtype=np.int16)
+    for genome in population:
+        room_busy = np.zeros((room_count, slot_count), dtype=bool)
+        teacher_busy = problem.teacher_unavailable.copy()
+        group_busy = np.zeros((len(problem.groups), slot_count), dtype=bool)
+        for k in rng.permutation(classes):
+            teacher, group = problem.class_teacher[k], problem.class_group[k]
+            free = ~room_busy & ~teacher_busy[teacher] & ~group_busy[group] & (problem.room_capacity >= problem.class_size[k])[:, None]
+            preferred = free & ~problem.bad_slot
+            places = np.flatnonzero(preferred if preferred.any() else free)
+            place = rng.choice(places) if len(places) else rng.integers(room_count * slot_count)
+            room, slot = divmod(int(place), slot_count)
+            genome[0, k], genome[1, k] = room, slot
+            room_busy[room, slot] = teacher_busy[teacher, slot] = group_busy[group, slot] = True
+    return population
+
+
 if __name__ == "__main__":
     # population = generate_matrix_population(10, ['M', 'L', 'I', 'G', 'H', 'T', 'X'], 5)
     population = generate_nqueen_board(2, 8, 8)
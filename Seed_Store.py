@@ -0,0 +1,162 @@
+import hashlib
+import json
+import os
+import time
+from typing import Callable, Dict, Optional, Sequence
+
+import numpy as np
+
+
+# --- PROBLEM FINGERPRINTS ---
+# A problem is identified by its encoding ('binary', 'permutation', 'timetable', ...) and a hash of the instance data.
+# Arrays are hashed by dtype, shape and raw bytes, so reloading the same instance from disk gives the same fingerprint.
+# Labels ('name' is the file path for loaded instances, 'names' the city labels) are not part of the data and are skipped.
+
+LABEL_FIELDS = ('name', 'names')
+
+def _feed(digest, value) -> None:
+    if isinstance(value, np.ndarray):
+        digest.update(f"array{value.dtype.str}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for key in sorted(value, key=repr):
+            _feed(digest, key)
+            _feed(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"{type(value).__name__}{len(value)}".encode()) # Namedtuples keep their type name
+        for item in value:
+            _feed(digest, item)
+    elif hasattr(value, 'shape') and hasattr(value, 'coordinates'): # TSP_Data.OnDemandDistances
+        _feed(digest, value.coordinates)
+    else:
+        digest.update(repr(value).encode())
+
+# The data fields of an instance namedtuple (KnapsackInstance, TSPInstance, TimetableProblem, ...), or the value itself
+def _instance_data(instance):
+    if not hasattr(instance, '_asdict'):
+        return instance
+    fields = {key: value for key, value in instance._asdict().items() if key not in LABEL_FIELDS}
+    if fields.get('coordinates') is not None:
+        fields.pop('distance_matrix', None) # Computed from the coordinates
+    return fields
+
+def problem_fingerprint(instance, encoding: str) -> str:
+    digest = hashlib.sha1()
+    _feed(digest, _instance_data(instance))
+    return f"{encoding}-{digest.hexdigest()[:16]}"
+
+
+# --- SEED STORE ---
+
+class SeedStore:
+    """
+    Keeps the top-K genomes found for every problem, keyed by problem fingerprint, so later runs can start warm.
+
+    The store is a directory with one index.json (encoding, genome shape, dtype and fitness of the stored genomes for every problem)
+    and one .npy file per problem holding its genomes as a (k, *genome shape) array in the smallest fitting integer dtype.
+    The index is read when the store is opened; genome files are only memory mapped when seeds of that problem are asked for.
+    """
+    def __init__(self, path: str = "seed_store", capacity: int = 10):
+        self.path = path
+        self.capacity = capacity
+        self.index_path = os.path.join(path, "index.json")
+        self.index: Dict[str, dict] = {}
+        if os.path.exists(self.index_path):
+            with open(self.index_path) as file:
+                self.index = json.load(file)
+
+    def __contains__(self, fingerprint: str) -> bool:
+        return fingerprint in self.index
+
+    def _genome_path(self, fingerprint: str) -> str:
+        return os.path.join(self.path, self.index[fingerprint]['file'])
+
+    def genomes(self, fingerprint: str) -> np.ndarray:
+        if fingerprint not in self.index:
+            return np.empty((0,))
+        return np.load(self._genome_path(fingerprint), mmap_mode='r')
+
+    def fitnesses(self, fingerprint: str) -> np.ndarray:
+        return np.asarray(self.index.get(fingerprint, {}).get('fitnesses', []), dtype=float)
+
+    def seeds(self, fingerprint: str, count: int, genome_shape: Optional[tuple] = None, similar: bool = True) -> np.ndarray:
+        """
+        Up to 'count' stored genomes for the problem, best first.
+        With 'similar', problems of the same encoding and genome shape (most recently updated first) fill up the rest,
+        e.g. the elites of a knapsack instance whose values changed slightly.
+        """
+        if fingerprint in self.index:
+            genome_shape = tuple(self.index[fingerprint]['shape'])
+        if genome_shape is None or count <= 0:
+            return np.empty((0,))
+
+        encoding = fingerprint.rsplit('-', 1)[0]
+        candidates = [fingerprint] if fingerprint in self.index else []
+        if similar:
+            others = [key for key, entry in self.index.items()
+                      if key != fingerprint and entry['encoding'] == encoding and tuple(entry['shape']) == tuple(genome_shape)]
+            candidates += sorted(others, key=lambda key: self.index[key]['updated'], reverse=True)
+
+        found, total = [], 0
+        for key in candidates:
+            genomes = self.genomes(key)[:count - total]
+            found.append(np.array(genomes))
+            total += len(genomes)
+            if total >= count:
+                break
+        return np.concatenate(found) if found else np.empty((0, *genome_shape))
+
+    def update(self, fingerprint: str, population, fitnesses: Sequence[float]) -> None:
+        """
+        Merges a population (array or list of genomes) and its fitness values into the stored elites of the problem,
+        keeps the best 'capacity' distinct genomes and rewrites that problem's file.
+        """
+        population = np.asarray(population)
+        fitnesses = np.asarray(fitnesses, dtype=float)
+        if fingerprint in self.index and tuple(self.index[fingerprint]['shape']) == population.shape[1:]:
+            population = np.concatenate([np.array(self.genomes(fingerprint)), population])
+            fitnesses = np.concatenate([self.fitnesses(fingerprint), fitnesses])
+
+        _, first = np.unique(population.reshape(len(population), -1), axis=0, return_index=True)
+        best = first[np.argsort(-fitnesses[first], kind='stable')][:self.capacity]
+        genomes, fitnesses = population[best], fitnesses[best]
+        if np.issubdtype(genomes.dtype, np.integer) and len(genomes): # Binary genomes take 1 byte per gene, permutations of 60k cities 2
+            genomes = genomes.astype(np.result_type(np.min_scalar_type(int(genomes.min())), np.min_scalar_type(int(genomes.max()))))
+
+        os.makedirs(self.path, exist_ok=True)
+        file_name = f"{fingerprint}.npy"
+        temporary = os.path.join(self.path, f"{fingerprint}.tmp.npy")
+        np.save(temporary, genomes)
+        os.replace(temporary, os.path.join(self.path, file_name)) # Readers never see a half written file
+
+        self.index[fingerprint] = {
+            'file': file_name,
+            'encoding': fingerprint.rsplit('-', 1)[0],
+            'shape': list(genomes.shape[1:]),
+            'dtype': genomes.dtype.str,
+            'fitnesses': fitnesses.tolist(),
+            'updated': time.time(),
+        }
+        with open(self.index_path + ".tmp", 'w') as file:
+            json.dump(self.index, file, indent=1)
+        os.replace(self.index_path + ".tmp", self.index_path)
+
+
+# Wraps any populate function (list or array populations) so the first genomes are replaced by stored seeds.
+# At most 'fraction' of the population is seeded, the rest keeps its random (or heuristic) genomes for diversity.
+# Seeds of similar problems may break this instance's constraints, so put any repair around the seeded function.
+def seeded(populate_func: Callable[..., object], store: SeedStore, fingerprint: str, fraction: float = 0.1, similar: bool = True) -> Callable[..., object]:
+    def populate(*args, **kwargs):
+        population = populate_func(*args, **kwargs)
+        genome_shape = np.shape(population[0])
+        seeds = store.seeds(fingerprint, max(1, int(fraction * len(population))), genome_shape, similar)
+        if len(seeds) == 0 or seeds.shape[1:] != genome_shape:
+            return population
+
+        if isinstance(population, np.ndarray):
+            population[:len(seeds)] = seeds
+        else:
+            population[:len(seeds)] = seeds.tolist()
+        return population
+    return populate
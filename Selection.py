@@ -1,7 +1,9 @@
 from random import choices, choice
 from typing import List, Dict
 
-from Evolution import Genome, Population, FitnessFunc
+import numpy as np
+
+from Evolution import Genome, Population, FitnessFunc, ArrayPopulation, rng
 
 
 # SELECTION
@@ -113,4 +115,24 @@ def crowded_tournament_selection(population: Population, fronts: List[List[int]]
     if distances[i] > distances[j]:
         return population[i]
     else:
-        return population[j]
\ No newline at end of file
+        return population[j]
+
+
+# --- ARRAY POPULATION SELECTION ---
+# Used by run_array_evolution. The population arrives sorted by fitness in descending order,
+# and every function returns the indices of all parent pairs at once as an array of shape (pairs, 2).
+def roulette_wheel_selection_array(population: ArrayPopulation, fitness: np.ndarray, pairs: int) -> np.ndarray:
+    weights = fitness - fitness.min() + 1 if fitness.min() < 0 else fitness # Same shift as roulette_wheel_selection_positive
+    total_weight = weights.sum()
+    if total_weight == 0:
+        return rng.integers(len(population), size=(pairs, 2))
+    return rng.choice(len(population), size=(pairs, 2), p=weights / total_weight)
+
+def rank_selection_array(population: ArrayPopulation, fitness: np.ndarray, pairs: int) -> np.ndarray:
+    rank = np.arange(len(population), 0, -1, dtype=float)
+    return rng.choice(len(population), size=(pairs, 2), p=rank / rank.sum())
+
+def tournament_selection_array(population: ArrayPopulation, fitness: np.ndarray, pairs: int, candidates: int = 2) -> np.ndarray:
+    matches = rng.integers(len(population), size=(pairs, 2, candidates))
+    winners = np.argmax(fitness[matches], axis=2)
+    return np.take_along_axis(matches, winners[..., None], axis=2)[..., 0]
@@ -1,46 +1,89 @@
-from math import sqrt
 from functools import partial
+from typing import Optional
 
-from Evolution import Genome, Population, run_evolution
-from Population import generate_listed_permutation_population
+import numpy as np
+
+from Data_Structure import Change
+from Evolution import Genome, Population, GenerationStats, run_evolution
+from Population import generate_listed_permutation_population, generate_nearest_neighbour_population, reporting_diversity
 from Selection import roulette_wheel_selection_positive, tournament_selection, rank_selection
-from Crossover import davis_order_crossover
+from Crossover import davis_order_crossover, order_crossover
 from Mutation import swap_mutation
+from TSP_Data import instance_from_cities, load_tsplib
+from TSP_Local_Search import candidate_lists, local_search
+from Seed_Store import SeedStore, problem_fingerprint, seeded
 
 
+# Tours are lists of integer city ids, so every edge is one lookup in the numpy distance matrix
+def tour_length(genome: Genome) -> float:
+    tour = np.asarray(genome)
+    return float(distance_matrix[tour, np.roll(tour, -1)].sum())
 
-def distance(point1: float, point2: float) -> float:
-    return sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
+def fitness(genome: Genome) -> float:
+    return 1 / (tour_length(genome) + 1e-6)
 
 
-def fitness(genome: Genome) -> float:
-    total_distance = 0
+# --- INCREMENTAL EVALUATION ---
+# A swap or an inversion only changes the edges around the moved positions, so a mutated child's length is
+# its parent's length plus the difference on those 2-4 edges (the usual 2-opt delta).
+
+# Length difference of a single move, read off the tour after the move was applied
+def move_delta(genome: Genome, move: tuple) -> float:
+    kind, i, j = move
     n = len(genome)
-    for i in range(n):
-        from_city = genome[i]
-        to_city = genome[(i+1)%n]
-        total_distance += distance_matrix[from_city][to_city]
-    return 1 / (total_distance + 1e-6)
+    if i == j:
+        return 0.0
+    i, j = min(i, j), max(i, j)
+
+    if kind == 'inverse':
+        if j - i + 1 >= n - 1: # Reversing the whole cycle (or all but one city) leaves the tour length unchanged
+            return 0.0
+        before, after = genome[i-1], genome[(j+1)%n]
+        return (distance_matrix[before, genome[i]] + distance_matrix[genome[j], after]
+                - distance_matrix[before, genome[j]] - distance_matrix[genome[i], after])
 
+    # Swap: compare the edges around i and j with the cities exchanged back
+    def city_before_move(k: int):
+        return genome[j] if k == i else genome[i] if k == j else genome[k]
 
-def dynamic_crossover_probability(a: Genome, b: Genome, population: Population , fitness: fitness) -> float:
-    fitness_max = fitness(population[0])
-    fitness_min = fitness(population[-1])
-    if fitness_max == fitness_min:
+    edges = {(i-1) % n, i, (j-1) % n, j} # An edge (k, k+1) is identified by k
+    return sum(distance_matrix[genome[k], genome[(k+1)%n]] - distance_matrix[city_before_move(k), city_before_move((k+1)%n)] for k in edges)
+
+# Length difference of an arbitrary change, from the edges next to the changed positions: O(k) for k changed cities
+def change_delta(genome: Genome, change: Change) -> float:
+    n = len(genome)
+    old_cities = dict(zip(change.indices, change.old_values))
+    edges = {e % n for i in change.indices for e in (i - 1, i)}
+    return sum(distance_matrix[genome[k], genome[(k+1)%n]]
+               - distance_matrix[old_cities.get(k, genome[k]), old_cities.get((k+1)%n, genome[(k+1)%n])] for k in edges)
+
+def delta_fitness(genome: Genome, parent_fitness: float, change: Change, parent: Optional[Genome] = None) -> float:
+    if not change.indices:
+        return parent_fitness
+    if change.moves is not None and len(change.moves) == 1:
+        delta = move_delta(genome, change.moves[0])
+    elif 2 * len(change.indices) < len(genome):
+        delta = change_delta(genome, change)
+    else:
+        return fitness(genome)
+
+    parent_length = 1 / parent_fitness - 1e-6
+    return 1 / (parent_length + delta + 1e-6)
+
+
+# Both rates read the generation's cached statistics, so adaptive runs don't re-score the population per pair
+def dynamic_crossover_probability(a: Genome, b: Genome, stats: GenerationStats) -> float:
+    if stats.max == stats.min:
         return 0.0
-    
-    fitness_a = fitness(a)
-    fitness_b = fitness(b)
 
-    probability = abs(fitness_a - fitness_b) / (fitness_max - fitness_min)
+    probability = abs(stats.fitness(a) - stats.fitness(b)) / (stats.max - stats.min)
 
     return probability
 
-def dynamic_mutation_probabilty(a: Genome, population: Population, fitness: fitness, k: float = 0.5) -> float:
-    fitness_max = fitness(population[0])
-    if fitness_max == 0:
+def dynamic_mutation_probabilty(a: Genome, stats: GenerationStats, k: float = 0.5) -> float:
+    if stats.max == 0:
         return 0.0
-    probabilty = k*((fitness(a)/fitness_max)**2)
+    probabilty = k*((stats.fitness(a)/stats.max)**2)
     return probabilty
 
 cities = {
@@ -53,38 +96,46 @@ cities = {
     "G": (8, 10)
 }
 
-# Create a list of city names
-city_names = list(cities.keys())
+# City i of a tour is city_names[i]
+instance = instance_from_cities(cities)
+# instance = load_tsplib("berlin52.tsp") # Any TSPLIB instance works the same way
+
+city_names = instance.names
+city_ids = list(range(len(city_names)))
+distance_matrix = instance.distance_matrix
 
-# Create a distance matrix for easy lookup
-distance_matrix = {}
-for city1, coords1 in cities.items():
-    distance_matrix[city1] = {}
-    for city2, coords2 in cities.items():
-        if city1 == city2:
-            distance_matrix[city1][city2] = 0
-        else:
-            distance_matrix[city1][city2] = distance(coords1, coords2)
+# Memetic mode: 2-opt / Or-opt on every child, moves limited to each city's nearest neighbours
+neighbours = candidate_lists(instance, k=8)
+improve_tour = partial(local_search, distance_matrix=distance_matrix, neighbours=neighbours)
 
 
 
 if __name__ == "__main__":
-    tour = ['A', 'C', 'B', 'F', 'G', 'D', 'E']
+    tour = [0, 2, 1, 5, 6, 3, 4] # A C B F G D E
     # print(fitness(tour))
 
+    store = SeedStore()
+    fingerprint = problem_fingerprint(instance, 'permutation')
+
     population, generation = run_evolution(
-        populate_func=partial(generate_listed_permutation_population, size=100, list=city_names, genome_length=7),
+        # populate_func=seeded(partial(generate_listed_permutation_population, size=100, list=city_ids, genome_length=len(city_ids)), store, fingerprint),
+        populate_func=seeded(reporting_diversity(partial(generate_nearest_neighbour_population, size=100, distance_matrix=distance_matrix), "nearest neighbour tours"), store, fingerprint),
         selection_func=roulette_wheel_selection_positive,
-        crossover_func=davis_order_crossover,
+        crossover_func=order_crossover,
         mutation_func=swap_mutation,
         fitness_func=fitness,
         fitness_limit=1,
         generation_limit=1000,
         dynamic_crossover_probability= dynamic_crossover_probability,
-        dynamic_mutation_probability= partial(dynamic_mutation_probabilty, k=0.1)
+        dynamic_mutation_probability= partial(dynamic_mutation_probabilty, k=0.1),
+        delta_fitness_func= delta_fitness,
+        improvement_func= improve_tour,
+        improvement_time_budget= 0.05 # Seconds of local search per generation
     )
 
+    store.update(fingerprint, population[:store.capacity], [fitness(genome) for genome in population[:store.capacity]])
+
     print(generation)
     # for i in range(len(population[0])):
-    print(population[0])
+    print([city_names[city] for city in population[0]])
     print(fitness(population[0]))
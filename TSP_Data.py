@@ -0,0 +1,258 @@
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from Data_Structure import TSPInstance
+
+
+# --- DISTANCE FUNCTIONS ---
+# Vectorized over arrays of city coordinates. The TSPLIB metrics round like the reference implementation,
+# EXACT_2D is the plain Euclidean distance used by the hand written instances.
+
+def _nint(x: np.ndarray) -> np.ndarray:
+    return np.floor(x + 0.5)
+
+def _exact_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.sqrt(((a - b) ** 2).sum(axis=-1))
+
+def _euc_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return _nint(_exact_2d(a, b))
+
+def _ceil_2d(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    return np.ceil(_exact_2d(a, b))
+
+def _att(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    r = np.sqrt(((a - b) ** 2).sum(axis=-1) / 10.0)
+    t = _nint(r)
+    return np.where(t < r, t + 1, t)
+
+def _geo_radians(coordinates: np.ndarray) -> np.ndarray:
+    # TSPLIB stores DDD.MM (degrees and minutes) and its reference code uses PI = 3.141592
+    degrees = np.trunc(coordinates)
+    minutes = coordinates - degrees
+    return 3.141592 * (degrees + 5.0 * minutes / 3.0) / 180.0
+
+def _geo(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    a, b = _geo_radians(a), _geo_radians(b)
+    q1 = np.cos(a[..., 1] - b[..., 1])
+    q2 = np.cos(a[..., 0] - b[..., 0])
+    q3 = np.cos(a[..., 0] + b[..., 0])
+    distance = np.trunc(6378.388 * np.arccos(np.clip(0.5 * ((1.0 + q1) * q2 - (1.0 - q1) * q3), -1.0, 1.0)) + 1.0)
+    return np.where(np.all(a == b, axis=-1), 0.0, distance)
+
+DISTANCE_FUNCTIONS = {
+    'EXACT_2D': _exact_2d,
+    'EUC_2D': _euc_2d,
+    'CEIL_2D': _ceil_2d,
+    'ATT': _att,
+    'GEO': _geo,
+}
+
+
+# --- DISTANCE MATRIX ---
+
+class OnDemandDistances:
+    """
+    Distance lookups computed from the coordinate arrays instead of a stored n x n matrix.
+
+    Indexing matches a dense numpy matrix: distances[i, j] with integer ids or id arrays, and distances[i][j].
+    """
+    def __init__(self, coordinates: np.ndarray, edge_weight_type: str = 'EXACT_2D', dtype: type = np.float64):
+        self.coordinates = coordinates
+        self.distance = DISTANCE_FUNCTIONS[edge_weight_type]
+        self.dtype = dtype
+        self.shape = (len(coordinates), len(coordinates))
+
+    def __len__(self) -> int:
+        return len(self.coordinates)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            i, j = key
+            distances = self.distance(self.coordinates[i], self.coordinates[j]).astype(self.dtype)
+            return distances if np.ndim(distances) else distances.item()
+        return self.distance(self.coordinates[key], self.coordinates).astype(self.dtype) # One full row
+
+
+def build_distance_matrix(coordinates: np.ndarray, edge_weight_type: str = 'EXACT_2D', dense_limit: int = 5000, dtype: type = np.float64):
+    if edge_weight_type not in DISTANCE_FUNCTIONS:
+        raise ValueError(f"Unsupported edge weight type: {edge_weight_type}")
+
+    # Past dense_limit cities a full matrix gets too big (50k cities in float64 would be 20 GB)
+    if len(coordinates) > dense_limit:
+        return OnDemandDistances(coordinates, edge_weight_type, dtype)
+
+    distance = DISTANCE_FUNCTIONS[edge_weight_type]
+    matrix = np.empty((len(coordinates), len(coordinates)), dtype=dtype)
+    for start in range(0, len(coordinates), 512): # Row blocks keep the temporary arrays small
+        matrix[start:start + 512] = distance(coordinates[start:start + 512, None, :], coordinates[None, :, :])
+    return matrix
+
+
+# --- TURN TABLE ---
+
+class TurnTable:
+    """
+    Whether a tour turns at city b when it goes a -> b -> c, i.e. the three cities are not collinear.
+
+    Up to dense_limit cities every answer is precomputed into a bitset of n^3 bits (2 MB for 256 cities);
+    above that the cross products are computed on demand from the coordinates, vectorized over all lookups of a call.
+    """
+    def __init__(self, coordinates: np.ndarray, dense_limit: int = 256):
+        self.coordinates = np.asarray(coordinates, dtype=float)
+        self.bits = None
+        n = len(self.coordinates)
+        if n <= dense_limit:
+            self.bits = np.empty((n, n, (n + 7) // 8), dtype=np.uint8)
+            every = np.arange(n)
+            for a in range(n):
+                self.bits[a] = np.packbits(self._cross_turns(np.full((n, 1), a), every[:, None], every[None, :]), axis=1)
+
+    def _cross_turns(self, a, b, c) -> np.ndarray:
+        pa, pb, pc = self.coordinates[a], self.coordinates[b], self.coordinates[c]
+        return (pb[..., 0] - pa[..., 0]) * (pc[..., 1] - pb[..., 1]) != (pb[..., 1] - pa[..., 1]) * (pc[..., 0] - pb[..., 0])
+
+    def is_turn(self, a, b, c) -> np.ndarray:
+        if self.bits is None:
+            return self._cross_turns(a, b, c)
+        c = np.asarray(c)
+        return ((self.bits[a, b, c >> 3] >> (7 - (c & 7))) & 1).astype(bool)
+
+    # Turns of a closed tour, one per city
+    def count(self, tour: list) -> int:
+        tour = np.asarray(tour)
+        return int(self.is_turn(np.roll(tour, 1), tour, np.roll(tour, -1)).sum())
+
+    # Turns at the given positions of the tour; 'city(k)' gives the city at position k
+    def _turns_at(self, positions: set, city, n: int) -> int:
+        if not positions:
+            return 0
+        centres = list(positions)
+        return int(self.is_turn([city((k - 1) % n) for k in centres], [city(k) for k in centres], [city((k + 1) % n) for k in centres]).sum())
+
+    def move_delta(self, tour: list, move: tuple) -> int:
+        """
+        Change in the number of turns caused by one ('swap', i, j) or ('inverse', i, j) move, read off the tour after the move.
+        Only the positions next to the moved cities can change, and collinearity doesn't depend on the direction of travel,
+        so an inversion only affects the two ends of the reversed segment.
+        """
+        kind, i, j = move
+        n = len(tour)
+        if i == j:
+            return 0
+        i, j = min(i, j), max(i, j)
+
+        # City at position k before the move, without copying the tour
+        if kind == 'inverse':
+            if j - i + 1 >= n - 1:
+                return 0 # The whole cycle (or all but one city) reversed is the same cycle
+            centres = {(i - 1) % n, i, j, (j + 1) % n}
+            before = lambda k: tour[i + j - k] if i <= k <= j else tour[k]
+        else:
+            centres = {(k + d) % n for k in (i, j) for d in (-1, 0, 1)}
+            before = lambda k: tour[j] if k == i else tour[i] if k == j else tour[k]
+
+        return self._turns_at(centres, tour.__getitem__, n) - self._turns_at(centres, before, n)
+
+    # Change in turns of an arbitrary change (see Data_Structure.Change), from the positions next to the changed cities
+    def change_delta(self, tour: list, change) -> int:
+        n = len(tour)
+        old_cities = dict(zip(change.indices, change.old_values))
+        centres = {(i + d) % n for i in change.indices for d in (-1, 0, 1)}
+        return self._turns_at(centres, tour.__getitem__, n) - self._turns_at(centres, lambda k: old_cities.get(k, tour[k]), n)
+
+
+# Converts a {name: (x, y)} dict to integer ids: city i is names[i]
+def instance_from_cities(cities: Dict[str, Tuple[float, float]], edge_weight_type: str = 'EXACT_2D', dense_limit: int = 5000, dtype: type = np.float64) -> TSPInstance:
+    names = list(cities.keys())
+    coordinates = np.array([cities[name] for name in names], dtype=float)
+    return TSPInstance(
+        name='cities',
+        names=names,
+        coordinates=coordinates,
+        distance_matrix=build_distance_matrix(coordinates, edge_weight_type, dense_limit, dtype)
+    )
+
+
+# --- TSPLIB ---
+
+def _explicit_matrix(weights: List[float], dimension: int, edge_weight_format: str, dtype: type) -> np.ndarray:
+    weights = np.asarray(weights, dtype=dtype)
+    if edge_weight_format == 'FULL_MATRIX':
+        return weights.reshape(dimension, dimension)
+
+    matrix = np.zeros((dimension, dimension), dtype=dtype)
+    if edge_weight_format == 'UPPER_ROW':
+        rows, cols = np.triu_indices(dimension, k=1)
+    elif edge_weight_format == 'LOWER_ROW':
+        rows, cols = np.tril_indices(dimension, k=-1)
+    elif edge_weight_format == 'UPPER_DIAG_ROW':
+        rows, cols = np.triu_indices(dimension)
+    elif edge_weight_format == 'LOWER_DIAG_ROW':
+        rows, cols = np.tril_indices(dimension)
+    else:
+        raise ValueError(f"Unsupported edge weight format: {edge_weight_format}")
+
+    if len(weights) != len(rows):
+        raise ValueError(f"Expected {len(rows)} edge weights, found {len(weights)}.")
+    matrix[rows, cols] = weights
+    matrix[cols, rows] = weights
+    return matrix
+
+
+def load_tsplib(path: str, dense_limit: int = 5000, dtype: type = np.float64) -> TSPInstance:
+    """
+    Loads a TSPLIB .tsp file (EUC_2D, CEIL_2D, ATT, GEO or EXPLICIT edge weights).
+
+    Cities get integer ids 0..n-1 in file order and names[i] keeps the original node label.
+    Coordinate instances above dense_limit cities compute distances on demand.
+    """
+    header = {}
+    labels, coordinates, weights = [], [], []
+    section = None
+
+    with open(path) as file:
+        for line in file:
+            line = line.strip()
+            if not line:
+                continue
+            if line == 'EOF':
+                break
+            if line.endswith('_SECTION'):
+                section = line
+                continue
+            if ':' in line: # Specification lines, data lines never contain ':'
+                key, _, value = line.partition(':')
+                header[key.strip()] = value.strip()
+                section = None
+                continue
+
+            fields = line.split()
+            if section == 'NODE_COORD_SECTION':
+                labels.append(fields[0])
+                coordinates.append((float(fields[1]), float(fields[2])))
+            elif section == 'EDGE_WEIGHT_SECTION':
+                weights.extend(float(field) for field in fields)
+            elif section == 'DISPLAY_DATA_SECTION' and not coordinates:
+                labels.append(fields[0])
+                coordinates.append((float(fields[1]), float(fields[2])))
+            # Other sections (tours, fixed edges) are not needed here
+
+    dimension = int(header['DIMENSION'])
+    edge_weight_type = header.get('EDGE_WEIGHT_TYPE', 'EUC_2D')
+    coordinate_array = np.array(coordinates, dtype=float) if coordinates else None
+    names = labels if labels else [str(i + 1) for i in range(dimension)]
+
+    if edge_weight_type == 'EXPLICIT':
+        distance_matrix = _explicit_matrix(weights, dimension, header.get('EDGE_WEIGHT_FORMAT', 'FULL_MATRIX'), dtype)
+    else:
+        if coordinate_array is None or len(coordinate_array) != dimension:
+            raise ValueError(f"Expected {dimension} node coordinates in {path}.")
+        distance_matrix = build_distance_matrix(coordinate_array, edge_weight_type, dense_limit, dtype)
+
+    return TSPInstance(
+        name=header.get('NAME', path),
+        names=names,
+        coordinates=coordinate_array,
+        distance_matrix=distance_matrix
+    )
@@ -0,0 +1,198 @@
+from collections import deque
+from time import perf_counter
+from typing import Optional
+
+import numpy as np
+
+from Evolution import Genome
+from Data_Structure import TSPInstance
+
+
+# --- CANDIDATE LISTS ---
+# Local search moves only try to connect a city to one of its K nearest neighbours.
+# The lists are built once per instance with a uniform grid as spatial index, so no n x n distances are needed.
+
+def nearest_neighbour_lists(coordinates: np.ndarray, k: int = 8) -> np.ndarray:
+    n = len(coordinates)
+    k = min(k, n - 1)
+
+    # Grid with about 2 cities per cell
+    low = coordinates.min(axis=0)
+    extent = np.maximum(coordinates.max(axis=0) - low, 1e-9)
+    cells_per_side = max(1, int(np.sqrt(n / 2)))
+    cell_size = extent.max() / cells_per_side
+    cell_xy = np.minimum(((coordinates - low) / cell_size).astype(np.int64), cells_per_side - 1)
+    cell_id = cell_xy[:, 0] * cells_per_side + cell_xy[:, 1]
+
+    order = np.argsort(cell_id, kind='stable')
+    cell_start = np.searchsorted(cell_id[order], np.arange(cells_per_side * cells_per_side + 1))
+
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for cell in np.unique(cell_id):
+        members = order[cell_start[cell]:cell_start[cell + 1]]
+        cx, cy = divmod(int(cell), cells_per_side)
+
+        # Grow the ring of searched cells until it provably contains the k nearest cities of every member:
+        # anything outside the ring is at least ring * cell_size away
+        ring = 1
+        while True:
+            xs = range(max(cx - ring, 0), min(cx + ring, cells_per_side - 1) + 1)
+            ys = range(max(cy - ring, 0), min(cy + ring, cells_per_side - 1) + 1)
+            candidates = np.concatenate([order[cell_start[x * cells_per_side + ys.start]:cell_start[x * cells_per_side + ys.stop]] for x in xs])
+            if len(candidates) > k:
+                distances = np.sqrt(((coordinates[members, None, :] - coordinates[None, candidates, :]) ** 2).sum(axis=2))
+                distances[members[:, None] == candidates[None, :]] = np.inf # A city is not its own neighbour
+                nearest = np.argpartition(distances, k - 1, axis=1)[:, :k]
+                kth = np.take_along_axis(distances, nearest, axis=1).max()
+                covers_everything = len(xs) == cells_per_side and len(ys) == cells_per_side
+                if kth <= ring * cell_size or covers_everything:
+                    break
+            ring += 1
+
+        nearest_distances = np.take_along_axis(distances, nearest, axis=1)
+        nearest = np.take_along_axis(nearest, np.argsort(nearest_distances, axis=1), axis=1)
+        neighbours[members] = candidates[nearest]
+    return neighbours
+
+# Same lists for instances that only have a distance matrix (TSPLIB EXPLICIT)
+def nearest_neighbour_lists_from_matrix(distance_matrix: np.ndarray, k: int = 8) -> np.ndarray:
+    n = len(distance_matrix)
+    k = min(k, n - 1)
+    neighbours = np.empty((n, k), dtype=np.int64)
+    for start in range(0, n, 512):
+        rows = np.array(distance_matrix[start:start + 512], dtype=float)
+        rows[np.arange(len(rows)), np.arange(start, start + len(rows))] = np.inf
+        nearest = np.argpartition(rows, k - 1, axis=1)[:, :k]
+        neighbours[start:start + 512] = np.take_along_axis(nearest, np.argsort(np.take_along_axis(rows, nearest, axis=1), axis=1), axis=1)
+    return neighbours
+
+def candidate_lists(instance: TSPInstance, k: int = 8) -> list:
+    if instance.coordinates is not None:
+        neighbours = nearest_neighbour_lists(instance.coordinates, k)
+    else:
+        neighbours = nearest_neighbour_lists_from_matrix(instance.distance_matrix, k)
+    return neighbours.tolist()
+
+
+# --- 2-OPT AND OR-OPT ---
+# Tours are lists of integer city ids and 'position[city]' is the index of a city in the tour.
+# Don't-look bits: only cities in the 'active' queue are tried; a city is re-activated when an edge next to it changes.
+
+EPSILON = 1e-9
+
+# Reverses the cyclic segment tour[start..end], or the complement when it is shorter (same cycle, fewer swaps)
+def _reverse(tour: list, position: list, start: int, end: int) -> None:
+    n = len(tour)
+    length = (end - start) % n + 1
+    if 2 * length > n:
+        start, end = (end + 1) % n, (start - 1) % n
+        length = n - length
+
+    for k in range(length // 2):
+        i, j = (start + k) % n, (end - k) % n
+        tour[i], tour[j] = tour[j], tour[i]
+        position[tour[i]], position[tour[j]] = i, j
+
+def _two_opt_move(tour: list, position: list, distance_matrix, neighbours: list, a: int) -> Optional[tuple]:
+    n = len(tour)
+    i = position[a]
+    for direction in (1, -1):
+        b = tour[(i + direction) % n]
+        d_ab = distance_matrix[a, b]
+        for c in neighbours[a]:
+            d_ac = distance_matrix[a, c]
+            if d_ac >= d_ab: # Neighbours are sorted, no later c can pay for the new edge
+                break
+            d = tour[(position[c] + direction) % n]
+            if c == b or d == a:
+                continue
+            if d_ac + distance_matrix[b, d] - d_ab - distance_matrix[c, d] < -EPSILON:
+                if direction == 1:
+                    _reverse(tour, position, position[b], position[c]) # a b ... c d -> a c ... b d
+                else:
+                    _reverse(tour, position, position[c], position[b]) # d c ... b a -> d b ... c a
+                return a, b, c, d
+    return None
+
+def _or_opt_move(tour: list, position: list, distance_matrix, neighbours: list, s: int, max_segment: int = 3) -> Optional[tuple]:
+    # Moves the segment that starts at s (1 to max_segment cities) next to one of the neighbours of s, in either orientation
+    n = len(tour)
+    i = position[s]
+    for length in range(1, min(max_segment, n - 3) + 1):
+        segment = [tour[(i + k) % n] for k in range(length)]
+        t = segment[-1]
+        p, nx = tour[(i - 1) % n], tour[(i + length) % n]
+        removal_gain = distance_matrix[p, s] + distance_matrix[t, nx] - distance_matrix[p, nx]
+        if removal_gain <= EPSILON:
+            continue
+
+        inside = set(segment)
+        for c in neighbours[s]:
+            if c in inside:
+                continue
+            for e in (tour[(position[c] + 1) % n], tour[(position[c] - 1) % n]):
+                if e in inside:
+                    continue
+                # Insert between c and e with s next to c
+                added = distance_matrix[c, s] + distance_matrix[t, e] - distance_matrix[c, e]
+                if added < removal_gain - EPSILON:
+                    _move_segment(tour, position, i, length, c, e)
+                    return p, nx, s, t, c, e
+    return None
+
+def _move_segment(tour: list, position: list, i: int, length: int, c: int, e: int) -> None:
+    # Moves tour[i..i+length-1] (s ... t) between the neighbours c and e, with s next to c and t next to e.
+    # Only the cities between the segment and the (c, e) edge move, on the shorter side of the cycle.
+    n = len(tour)
+    segment = [tour[(i + k) % n] for k in range(length)]
+    u = position[c] if tour[(position[c] + 1) % n] == e else position[e] # Edge (c, e) at positions u, u + 1
+
+    forward = (u - i) % n + 1 # Window from the segment start to the left end of the edge
+    backward = (i + length - 1 - u) % n # Window from the right end of the edge to the segment end
+    if forward <= backward:
+        start = i
+        between = [tour[(i + k) % n] for k in range(length, forward)]
+        window = between + (segment if tour[u] == c else segment[::-1])
+    else:
+        start = (u + 1) % n
+        between = [tour[(start + k) % n] for k in range(backward - length)]
+        window = (segment[::-1] if tour[start] == c else segment) + between
+
+    for k, city in enumerate(window):
+        tour[(start + k) % n] = city
+        position[city] = (start + k) % n
+
+def local_search(genome: Genome, distance_matrix, neighbours: list, deadline: Optional[float] = None, use_or_opt: bool = True) -> Genome:
+    """
+    Improves a tour with 2-opt and Or-opt moves restricted to the candidate lists, until no move improves it
+    or time.perf_counter() passes the deadline. The tour is changed in place and returned.
+    """
+    tour = genome
+    position = [0] * len(tour)
+    for k, city in enumerate(tour):
+        position[city] = k
+    if len(tour) < 5:
+        return tour
+
+    active = deque(tour)
+    is_active = [True] * len(tour)
+    steps = 0
+    while active:
+        steps += 1
+        if deadline is not None and steps % 64 == 0 and perf_counter() > deadline:
+            break
+
+        city = active.popleft()
+        is_active[city] = False
+
+        touched = _two_opt_move(tour, position, distance_matrix, neighbours, city)
+        if touched is None and use_or_opt:
+            touched = _or_opt_move(tour, position, distance_matrix, neighbours, city)
+        if touched is None:
+            continue
+
+        for other in touched + (city,):
+            if not is_active[other]:
+                is_active[other] = True
+                active.append(other)
+    return tour
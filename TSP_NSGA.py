@@ -1,41 +1,42 @@
-from math import sqrt
 from functools import partial
+from typing import Optional
 
+import numpy as np
+
+from Data_Structure import Change
 from Evolution import Genome, Population, run_evolution
-from NSGA import run_nsga2
+from NSGA import run_nsga2, ParetoArchive
+from NSGA_Indicators import ConvergenceMonitor
 from Population import generate_listed_permutation_population
 from Selection import roulette_wheel_selection_positive, tournament_selection, rank_selection, nsga2_tournament_selection
 from Crossover import davis_order_crossover
 from Mutation import swap_mutation
+from TSP_Data import instance_from_cities, TurnTable
 
 
 
-def distance(point1: float, point2: float) -> float:
-    return sqrt((point1[0] - point2[0])**2 + (point1[1] - point2[1])**2)
-
-
 def fitness(genome: Genome) -> float:
-    total_distance = 0
-    n = len(genome)
-    for i in range(n):
-        from_city = genome[i]
-        to_city = genome[(i+1)%n]
-        total_distance += distance_matrix[from_city][to_city]
+    tour = np.asarray(genome)
+    total_distance = distance_matrix[tour, np.roll(tour, -1)].sum()
     return 1 / (total_distance + 1e-6)
 
+# A turn is a change in direction at a city; the turn table answers it for every consecutive triple of the tour at once
 def fitness_turns(genome: Genome) -> float:
-    turns = 0
-    n = len(genome)
-    for i in range(n):
-        # A simple turn could be a change in direction
-        p1 = cities[genome[i]]
-        p2 = cities[genome[(i + 1) % n]]
-        p3 = cities[genome[(i + 2) % n]]
-
-        # This is a simplification; a more robust calculation would be needed
-        if (p2[0] - p1[0]) * (p3[1] - p2[1]) != (p2[1] - p1[1]) * (p3[0] - p2[0]):
-            turns += 1
-    return 1 / (turns + 1e-6) # We want to maximize this (minimize turns)
+    return 1 / (turn_table.count(genome) + 1e-6) # We want to maximize this (minimize turns)
+
+# Incremental turns for run_nsga2's delta path: swaps and inversions only change the turns next to the moved cities
+def delta_fitness_turns(genome: Genome, parent_fitness: float, change: Change, parent: Optional[Genome] = None) -> float:
+    if not change.indices:
+        return parent_fitness
+    if change.moves is not None and len(change.moves) == 1:
+        delta = turn_table.move_delta(genome, change.moves[0])
+    elif 2 * len(change.indices) < len(genome):
+        delta = turn_table.change_delta(genome, change)
+    else:
+        return fitness_turns(genome)
+
+    parent_turns = round(1 / parent_fitness - 1e-6)
+    return 1 / (parent_turns + delta + 1e-6)
 
 # cities = {
 #     "A": (0, 0),
@@ -58,33 +59,41 @@ cities = {
     "H": (7, 5)   # City 7
 }
 
-# Create a list of city names
-city_names = list(cities.keys())
-
-# Create a distance matrix for easy lookup
-distance_matrix = {}
-for city1, coords1 in cities.items():
-    distance_matrix[city1] = {}
-    for city2, coords2 in cities.items():
-        if city1 == city2:
-            distance_matrix[city1][city2] = 0
-        else:
-            distance_matrix[city1][city2] = distance(coords1, coords2)
+# Tours are lists of integer city ids, city i is city_names[i]
+instance = instance_from_cities(cities)
+city_names = instance.names
+city_ids = list(range(len(city_names)))
+turn_table = TurnTable(instance.coordinates)
+distance_matrix = instance.distance_matrix
 
 if __name__ == "__main__":
+    # Keeps every trade-off found during the run, even the ones later lost to crowding
+    archive = ParetoArchive(objective_count=2, capacity=50)
+
+    # Stops once the hypervolume of the first front stalls for 100 generations (objectives are 1/distance and 1/turns, so 0 is a safe reference)
+    monitor = ConvergenceMonitor(reference_point=[0.0, 0.0], patience=100)
+
     final_solutions, generations = run_nsga2(
-        populate_func=partial(generate_listed_permutation_population, size=10, list=city_names, genome_length=len(city_names)),
+        populate_func=partial(generate_listed_permutation_population, size=10, list=city_ids, genome_length=len(city_ids)),
         fitness_funcs=[fitness, fitness_turns], # Pass both fitness functions
         selection_func=nsga2_tournament_selection, # Use the new selection function
         crossover_func=davis_order_crossover,
         mutation_func=swap_mutation,
         generation_limit=500,
+        archive=archive,
+        monitor=monitor,
+        delta_fitness_funcs=[None, delta_fitness_turns] # Distance is evaluated, turns come from the parent's count
     )
 
+    print(f"Hypervolume: {monitor.history[-1].hypervolume}, spread: {monitor.history[-1].spread}")
     print(f"Found {len(final_solutions)} non-dominated solutions:")
     print(f"{generations} Genetations:")
     for solution in final_solutions:
-        print(f"Tour: {solution}, Distance: {1/fitness(solution)}, Turns: {1/fitness_turns(solution)}")
+        print(f"Tour: {[city_names[city] for city in solution]}, Distance: {1/fitness(solution)}, Turns: {1/fitness_turns(solution)}")
+
+    print(f"Archive of {len(archive)} non-dominated solutions seen during the run:")
+    for solution in archive.genomes:
+        print(f"Tour: {[city_names[city] for city in solution]}, Distance: {1/fitness(solution)}, Turns: {1/fitness_turns(solution)}")
 
 # if __name__ == "__main__":
 #     tour = ['A', 'C', 'B', 'F', 'G', 'D', 'E']
@@ -0,0 +1,133 @@
+import csv
+import json
+import os
+from typing import Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from Data_Structure import Room, Teacher, Course, Group, TimeSlot, TimetableProblem
+from Class_Scheduling import BAD_DAYS, timetable_problem
+
+
+# --- TIMETABLE DATASETS ---
+# A dataset is either a directory of CSV files or a single JSON file with the same tables:
+#   teachers.csv      id,name
+#   rooms.csv         id,name,capacity
+#   courses.csv       id,name,teacher_id
+#   groups.csv        id,name,size,course_ids      (course_ids separated by ';')
+#   time_slots.csv    id,day,time
+#   availability.csv  teacher_id,slot_id           (optional, the slots a teacher can teach in; teachers without rows can teach anytime)
+# The JSON file holds a list of objects with these fields under each table name (course_ids as a list).
+#
+# File ids can be any string. They are interned to integer ids 0..n-1 in file order, so entity.id is also its index.
+
+TABLES = {
+    'teachers': ['id', 'name'],
+    'rooms': ['id', 'name', 'capacity'],
+    'courses': ['id', 'name', 'teacher_id'],
+    'groups': ['id', 'name', 'size', 'course_ids'],
+    'time_slots': ['id', 'day', 'time'],
+    'availability': ['teacher_id', 'slot_id'],
+}
+
+
+def _csv_rows(directory: str, table: str) -> Iterator[Tuple[str, dict]]:
+    path = os.path.join(directory, f"{table}.csv")
+    if table == 'availability' and not os.path.exists(path):
+        return
+
+    with open(path, newline='') as file:
+        reader = csv.DictReader(file)
+        missing = [field for field in TABLES[table] if field not in (reader.fieldnames or [])]
+        if missing:
+            raise ValueError(f"{path}: missing columns {missing}.")
+        for row in reader:
+            if table == 'groups':
+                row['course_ids'] = [course_id.strip() for course_id in row['course_ids'].split(';') if course_id.strip()]
+            yield f"{path}:{reader.line_num}", row
+
+def _json_rows(data: dict, path: str, table: str) -> Iterator[Tuple[str, dict]]:
+    if table not in data:
+        if table == 'availability':
+            return
+        raise ValueError(f"{path}: missing table '{table}'.")
+
+    for i, row in enumerate(data[table]):
+        missing = [field for field in TABLES[table] if field not in row]
+        if missing:
+            raise ValueError(f"{path}: {table}[{i}] is missing {missing}.")
+        yield f"{path}: {table}[{i}]", {field: row[field] if field == 'course_ids' else str(row[field]) for field in TABLES[table]}
+
+
+class _Interner:
+    # Maps the file ids of one table to 0..n-1 and reports duplicates and unknown references with their location
+    def __init__(self, table: str):
+        self.table = table
+        self.index: Dict[str, int] = {}
+
+    def add(self, key: str, where: str) -> int:
+        key = str(key).strip()
+        if key in self.index:
+            raise ValueError(f"{where}: duplicate {self.table} id '{key}'.")
+        self.index[key] = len(self.index)
+        return self.index[key]
+
+    def __call__(self, key: str, where: str) -> int:
+        try:
+            return self.index[str(key).strip()]
+        except KeyError:
+            raise ValueError(f"{where}: unknown {self.table} id '{key}'.") from None
+
+def _positive_int(value: str, field: str, where: str) -> int:
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f"{where}: {field} must be an integer, found '{value}'.") from None
+    if number <= 0:
+        raise ValueError(f"{where}: {field} must be positive, found {number}.")
+    return number
+
+
+def _build_problem(rows, bad_days: tuple) -> TimetableProblem:
+    teacher_ids, room_ids, course_ids, group_ids, slot_ids = (_Interner(table) for table in ('teacher', 'room', 'course', 'group', 'time slot'))
+
+    teachers: List[Teacher] = [Teacher(teacher_ids.add(row['id'], where), row['name']) for where, row in rows('teachers')]
+    rooms: List[Room] = [Room(room_ids.add(row['id'], where), row['name'], _positive_int(row['capacity'], 'capacity', where)) for where, row in rows('rooms')]
+    time_slots: List[TimeSlot] = [TimeSlot(slot_ids.add(row['id'], where), row['day'], row['time']) for where, row in rows('time_slots')]
+    courses: List[Course] = [Course(course_ids.add(row['id'], where), row['name'], teacher_ids(row['teacher_id'], where)) for where, row in rows('courses')]
+    groups: List[Group] = [
+        Group(group_ids.add(row['id'], where), row['name'], _positive_int(row['size'], 'size', where), [course_ids(course_id, where) for course_id in row['course_ids']])
+        for where, row in rows('groups')
+    ]
+
+    for table, entities in (('teachers', teachers), ('rooms', rooms), ('time_slots', time_slots), ('courses', courses), ('groups', groups)):
+        if not entities:
+            raise ValueError(f"The dataset has no {table}.")
+
+    # Teachers listed in the availability table can only teach in their listed slots
+    available = np.zeros((len(teachers), len(time_slots)), dtype=bool)
+    listed = np.zeros(len(teachers), dtype=bool)
+    for where, row in rows('availability'):
+        teacher = teacher_ids(row['teacher_id'], where)
+        available[teacher, slot_ids(row['slot_id'], where)] = True
+        listed[teacher] = True
+
+    return timetable_problem(teachers, rooms, courses, groups, time_slots, bad_days, teacher_unavailable=listed[:, None] & ~available)
+
+
+def load_timetable_csv(directory: str, bad_days: tuple = BAD_DAYS) -> TimetableProblem:
+    return _build_problem(lambda table: _csv_rows(directory, table), bad_days)
+
+def load_timetable_json(path: str, bad_days: tuple = BAD_DAYS) -> TimetableProblem:
+    with open(path) as file:
+        data = json.load(file)
+    return _build_problem(lambda table: _json_rows(data, path, table), bad_days)
+
+def load_timetable(path: str, bad_days: tuple = BAD_DAYS) -> TimetableProblem:
+    """
+    Loads a timetable dataset from a CSV directory or a .json file, validates every reference
+    and returns the TimetableProblem tables used by the array timetable operators.
+    """
+    if os.path.isdir(path):
+        return load_timetable_csv(path, bad_days)
+    return load_timetable_json(path, bad_days)